@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from pypicgo.core import PicGoCore
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="PicGoCore.run throughput against the mock adapter")
+    parser.add_argument("--files", type=int, default=50)
+    parser.add_argument("--delay", type=float, default=0.05, help="simulated round trip per file (s)")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        base = Path(tmp)
+        files = []
+        for i in range(args.files):
+            p = base / f"img_{i:04d}.png"
+            p.write_bytes(b"\x89PNG" + i.to_bytes(4, "big"))
+            files.append(str(p))
+
+        core = PicGoCore(base / "home")
+        core.config.set_global_config({
+            "history_enabled": False,
+            "copy_to_clipboard": False,
+            "max_workers": max(args.concurrency),
+        })
+        core = PicGoCore(base / "home")
+
+        baseline = None
+        print(f"{'concurrency':>11} {'seconds':>8} {'files/s':>8} {'speedup':>8}")
+        for n in args.concurrency:
+            core.config.set_host_config("mock", {"delay": args.delay, "max_concurrency": n})
+            start = time.perf_counter()
+            out = core.run(files, host="mock", fmt="url", use_cache=False)
+            elapsed = time.perf_counter() - start
+            urls = out.splitlines()
+            assert [u.rsplit("/", 1)[-1] for u in urls] == [Path(f).name for f in files], "order lost"
+            baseline = baseline or elapsed
+            print(f"{n:>11} {elapsed:>8.3f} {len(files) / elapsed:>8.1f} {baseline / elapsed:>7.1f}x")
+        core.scheduler.shutdown()
+
+
+if __name__ == "__main__":
+    main()
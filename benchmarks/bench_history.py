@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from pypicgo.core.history import HISTORY_BACKENDS, open_history
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="HistoryStore.add cost as history grows")
+    parser.add_argument("--checkpoints", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--sample", type=int, default=200, help="adds timed at each checkpoint")
+    parser.add_argument("--backend", choices=HISTORY_BACKENDS, nargs="+", default=list(HISTORY_BACKENDS))
+    args = parser.parse_args()
+
+    files = ["C:/Users/me/Pictures/Screenshot 2024-01-01 120000.png"]
+    urls = ["https://i0.hdslb.com/bfs/new_dyn/0123456789abcdef0123456789abcdef.png"]
+    print(f"{'backend':>8} {'records':>8} {'us/add':>8}")
+    for backend in args.backend:
+        with tempfile.TemporaryDirectory() as tmp:
+            store = open_history(Path(tmp), backend)
+            count = 0
+            for target in args.checkpoints:
+                # Bulk-fill up to the checkpoint, then time individual adds
+                filler = max(0, target - count)
+                store.add_records([{"time": "", "host": "bilibili", "files": files, "urls": urls}] * filler)
+                count += filler
+                start = time.perf_counter()
+                for _ in range(args.sample):
+                    store.add(files, "bilibili", urls)
+                elapsed = time.perf_counter() - start
+                count += args.sample
+                print(f"{backend:>8} {count:>8} {elapsed / args.sample * 1e6:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from pypicgo.core import PicGoCore
+
+HOST_CONFIG = {
+    "github": {"repo": "bench/images", "token": "x", "path": "img"},
+    "smms": {"token": "x"},
+    "bilibili": {"sessdata": "x", "bili_jct": "x"},
+}
+
+
+def parse_size(value: str) -> int:
+    units = {"k": 1024, "m": 1024 * 1024}
+    value = value.lower()
+    return int(float(value[:-1]) * units[value[-1]]) if value[-1] in units else int(value)
+
+
+def peak_rss_kb() -> int | None:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss // 1024 if sys.platform == "darwin" else rss
+
+
+def run_case(args: argparse.Namespace) -> Dict[str, Any]:
+    # One host/size/batch combination in a fresh process, so peak RSS is its own
+    with tempfile.TemporaryDirectory() as tmp:
+        base = Path(tmp)
+        core = PicGoCore(base / "home")
+        core.config.set_global_config({"history_enabled": False, "copy_to_clipboard": False})
+        core.config.set_host_config(
+            args.host, {**HOST_CONFIG[args.host], "api_base": f"http://127.0.0.1:{args.port}/{args.host}"}
+        )
+        latencies: List[float] = []
+        files_done = failed_runs = 0
+        elapsed_total = 0.0
+        for run in range(args.runs):
+            files = []
+            for i in range(args.batch):
+                p = base / f"r{run}_{i:04d}.png"
+                p.write_bytes(b"\x89PNG\r\n\x1a\n" + os.urandom(args.size))
+                files.append(str(p))
+            start = time.perf_counter()
+            done: List[float] = []
+            try:
+                core.run(files, host=args.host, use_cache=False, on_result=lambda i, url: done.append(time.perf_counter()))
+            except Exception:
+                failed_runs += 1
+            elapsed_total += time.perf_counter() - start
+            latencies += [t - start for t in done]
+            files_done += len(done)
+            for f in files:
+                os.unlink(f)
+    latencies.sort()
+    return {
+        "files_per_s": files_done / elapsed_total if elapsed_total else 0.0,
+        "p50_ms": statistics.median(latencies) * 1000 if latencies else None,
+        "p99_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000 if latencies else None,
+        "failed_runs": failed_runs,
+        "peak_rss_kb": peak_rss_kb(),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Real adapters against local stand-in servers")
+    parser.add_argument("--hosts", nargs="+", choices=list(HOST_CONFIG), default=list(HOST_CONFIG))
+    parser.add_argument("--sizes", nargs="+", default=["10k", "1m"], help="bytes per file (k/m suffixes)")
+    parser.add_argument("--batches", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.02, help="stand-in response delay (s)")
+    parser.add_argument("--bandwidth", type=float, default=0.0, help="bytes/s per upload, 0 = unlimited")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of 502 responses")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="fraction of 429 responses")
+    parser.add_argument("--case", nargs=3, metavar=("HOST", "SIZE", "BATCH"), help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, default=0, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.case:
+        args.host, size, batch = args.case
+        args.size, args.batch = parse_size(size), int(batch)
+        print(json.dumps(run_case(args)))
+        return
+
+    # The stand-ins get their own process so they don't compete for our GIL or inflate our RSS
+    server = subprocess.Popen(
+        [
+            sys.executable, str(Path(__file__).with_name("standins.py")), "--port", "0",
+            "--latency", str(args.latency), "--bandwidth", str(args.bandwidth),
+            "--error-rate", str(args.error_rate), "--rate-limit-rate", str(args.rate_limit_rate),
+        ],
+        stdout=subprocess.PIPE, text=True,
+    )
+    try:
+        banner = server.stdout.readline() if server.stdout else ""
+        port = banner.split("127.0.0.1:", 1)[1].split("/", 1)[0]
+        print(f"{'host':>9} {'size':>6} {'batch':>5} {'files/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'rss MB':>7} {'failed':>6}")
+        for host in args.hosts:
+            for size in args.sizes:
+                for batch in args.batches:
+                    out = subprocess.run(
+                        [
+                            sys.executable, __file__, "--case", host, size, str(batch),
+                            "--port", port, "--runs", str(args.runs),
+                        ],
+                        check=True, capture_output=True, text=True,
+                    ).stdout
+                    row = json.loads(out.strip().splitlines()[-1])
+                    p50 = f"{row['p50_ms']:.1f}" if row["p50_ms"] is not None else "-"
+                    p99 = f"{row['p99_ms']:.1f}" if row["p99_ms"] is not None else "-"
+                    rss = f"{row['peak_rss_kb'] / 1024:.1f}" if row["peak_rss_kb"] else "n/a"
+                    print(
+                        f"{host:>9} {size:>6} {batch:>5} {row['files_per_s']:>8.1f} {p50:>8} {p99:>8}"
+                        f" {rss:>7} {row['failed_runs']:>6}"
+                    )
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from pypicgo.api.app import PooledHTTPServer, PypicgoHandler
+from pypicgo.core import PicGoCore
+
+
+class QuietHandler(PypicgoHandler):
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="/health latency while uploads are in flight")
+    parser.add_argument("--uploads", type=int, default=8, help="concurrent /upload clients")
+    parser.add_argument("--delay", type=float, default=1.0, help="mock upload time per file (s)")
+    parser.add_argument("--probes", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=16)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        base = Path(tmp)
+        core = PicGoCore(base / "home")
+        core.config.set_global_config({"history_enabled": False, "copy_to_clipboard": False})
+        core.config.set_host_config("mock", {"delay": args.delay, "max_concurrency": args.uploads})
+        QuietHandler.core = core
+        server = PooledHTTPServer(("127.0.0.1", 0), QuietHandler, workers=args.workers)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_port}"
+
+        def probe() -> float:
+            start = time.perf_counter()
+            urllib.request.urlopen(url + "/health").read()
+            return (time.perf_counter() - start) * 1000
+
+        idle = [probe() for _ in range(args.probes)]
+
+        def upload(i: int) -> None:
+            f = base / f"img_{i}.png"
+            f.write_bytes(i.to_bytes(4, "big"))
+            body = json.dumps({"files": [str(f)], "host": "mock", "no_cache": True}).encode()
+            urllib.request.urlopen(urllib.request.Request(url + "/upload", data=body, method="POST")).read()
+
+        threads = [threading.Thread(target=upload, args=(i,)) for i in range(args.uploads)]
+        for t in threads:
+            t.start()
+        time.sleep(0.05)
+        busy = [probe() for _ in range(args.probes)]
+        for t in threads:
+            t.join()
+        server.shutdown()
+        server.server_close()
+
+        for label, samples in (("idle", idle), ("uploading", busy)):
+            samples.sort()
+            p99 = samples[int(len(samples) * 0.99) - 1]
+            print(f"{label:>10}: p50 {statistics.median(samples):6.2f} ms  p99 {p99:6.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
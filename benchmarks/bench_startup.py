@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from pypicgo.core.config import ConfigManager
+
+# What an editor hook pays per paste: interpreter start-up plus one CLI command
+COMMANDS = {
+    "import": [sys.executable, "-c", "import pypicgo.cli.main"],
+    "config-get": [sys.executable, "-m", "pypicgo.cli.main", "config", "get"],
+    "upload-mock": [sys.executable, "-m", "pypicgo.cli.main", "upload", "--host", "mock", "--no-cache", "{file}"],
+    "baseline": [sys.executable, "-c", "pass"],
+}
+
+
+def run_once(cmd: List[str], env: Dict[str, str]) -> float:
+    start = time.perf_counter()
+    subprocess.run(cmd, cwd=ROOT, env=env, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+
+def import_profile(env: Dict[str, str], top: int) -> List[Tuple[int, str]]:
+    # -X importtime prints "import time: self | cumulative | module" to stderr
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import pypicgo.cli.main; pypicgo.cli.main._core()"],
+        cwd=ROOT, env=env, check=True, capture_output=True, text=True,
+    )
+    rows: List[Tuple[int, str]] = []
+    for line in proc.stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) == 3 and parts[1].strip().isdigit():
+            rows.append((int(parts[1]), parts[2].rstrip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="CLI start-up time (fresh interpreter per run)")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--commands", nargs="+", choices=list(COMMANDS), default=list(COMMANDS))
+    parser.add_argument("--top", type=int, default=15, help="slowest imports to list (cumulative)")
+    parser.add_argument("--max-ms", type=float, default=None, help="fail if config-get median exceeds this")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as home:
+        # Isolated ~/.pypicgo so the run doesn't touch (or depend on) the user's config
+        env = dict(os.environ, HOME=home, USERPROFILE=home, PYTHONPATH=str(ROOT))
+        sample = Path(home) / "sample.png"
+        sample.write_bytes(b"\x89PNG\r\n\x1a\n" + os.urandom(1024))
+        # Written directly: `config set --kv` stores strings, and "false" would leave the
+        # clipboard on, so upload-mock would time the clipboard copy too
+        config = ConfigManager(Path(home) / ".pypicgo")
+        config.set_global_config({"copy_to_clipboard": False})
+        config.set_host_config("mock", {"delay": 0})
+
+        print(f"{'command':>12} {'median ms':>10} {'min ms':>8}")
+        medians: Dict[str, float] = {}
+        for name in args.commands:
+            cmd = [part.replace("{file}", str(sample)) for part in COMMANDS[name]]
+            run_once(cmd, env)  # warm the OS file cache and __pycache__
+            times = [run_once(cmd, env) for _ in range(args.runs)]
+            medians[name] = statistics.median(times) * 1000
+            print(f"{name:>12} {medians[name]:>10.1f} {min(times) * 1000:>8.1f}")
+
+        print("\nslowest imports for an upload (cumulative us):")
+        for us, module in import_profile(env, args.top):
+            print(f"{us:>10} {module}")
+
+    if args.max_ms is not None and medians.get("config-get", 0) > args.max_ms:
+        print(f"\nconfig-get median {medians['config-get']:.1f} ms exceeds --max-ms {args.max_ms}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+# Round-trips multipart bodies through read_multipart with part sizes around the 64 KiB
+# readline() chunk, where a line can be split between the CR and LF before the
+# delimiter. Passes if every part comes back byte for byte.
+
+import argparse
+import io
+import sys
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from pypicgo.api.uploads import _CHUNK, BodyReader, read_multipart
+
+BOUNDARY = "pypicgo-check"
+
+
+def body(parts: List[bytes]) -> bytes:
+    out = b""
+    for i, data in enumerate(parts):
+        out += (
+            f"--{BOUNDARY}\r\n"
+            f'Content-Disposition: form-data; name="file"; filename="f{i}.bin"\r\n'
+            "Content-Type: application/octet-stream\r\n\r\n"
+        ).encode("latin-1") + data + b"\r\n"
+    return out + f"--{BOUNDARY}--\r\n".encode("latin-1")
+
+
+def check(parts: List[bytes]) -> bool:
+    raw = body(parts)
+    files, _ = read_multipart(BodyReader(io.BytesIO(raw), len(raw)), BOUNDARY)
+    got = [f.data.read() for f in files]
+    return got == parts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="read_multipart around readline() chunk boundaries")
+    parser.add_argument("--chunks", type=int, default=3, help="check sizes up to this many chunks")
+    args = parser.parse_args()
+
+    sizes = sorted({n * _CHUNK + d for n in range(args.chunks + 1) for d in (-2, -1, 0, 1) if n * _CHUNK + d >= 0})
+    failed = []
+    for size in sizes:
+        # Plain bytes, bytes ending in CR, and a final line of exactly this length
+        for data in (b"a" * size, b"a" * max(size - 1, 0) + b"\r", b"x\n" + b"a" * size):
+            if not check([data, b"second"]):
+                failed.append((size, data[-1:]))
+    print(f"{len(sizes) * 3 - len(failed)}/{len(sizes) * 3} bodies intact -> {'PASS' if not failed else 'FAIL'}")
+    for size, tail in failed:
+        print(f"  size {size}, ending {tail!r}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+# Local stand-ins for the GitHub, SM.MS and Bilibili upload APIs, served from one
+# port under /github, /smms and /bilibili. Point an adapter at them with
+# hosts.<name>.api_base, e.g. http://127.0.0.1:PORT/github.
+
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Tuple
+
+_CHUNK = 64 * 1024
+
+
+@dataclass
+class Behaviour:
+    latency: float = 0.0  # seconds added to every response
+    bandwidth: float = 0.0  # request body bytes/s, 0 = unlimited
+    error_rate: float = 0.0  # fraction of requests answered with 502
+    rate_limit_rate: float = 0.0  # fraction answered with 429 + Retry-After: 1
+
+
+class _GitHubRepo:
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.files: Dict[str, str] = {}  # path -> blob sha
+        self.head = uuid.uuid4().hex + "00000000"
+        self.objects: Dict[str, Any] = {}
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; without this, Nagle plus delayed ACKs
+    # add ~40 ms per response that a real server wouldn't
+    disable_nagle_algorithm = True
+    behaviour = Behaviour()
+    repo = _GitHubRepo()
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def _read_body(self) -> bytes:
+        remaining = int(self.headers.get("Content-Length") or 0)
+        chunks = []
+        while remaining > 0:
+            chunk = self.rfile.read(min(_CHUNK, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            chunks.append(chunk)
+            if self.behaviour.bandwidth > 0:
+                time.sleep(len(chunk) / self.behaviour.bandwidth)
+        return b"".join(chunks)
+
+    def _send(self, status: int, payload: Any, headers: Dict[str, str] | None = None) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _handle(self) -> None:
+        body = self._read_body()
+        b = self.behaviour
+        if b.latency:
+            time.sleep(b.latency)
+        roll = random.random()
+        if roll < b.error_rate:
+            self._send(502, {"message": "bad gateway"})
+            return
+        if roll < b.error_rate + b.rate_limit_rate:
+            self._send(429, {"message": "slow down"}, {"Retry-After": "1"})
+            return
+        path = self.path.split("?", 1)[0]
+        if path.startswith("/github/"):
+            self._send(*self._github(path[len("/github"):], body))
+        elif path == "/smms/upload":
+            url = f"https://stand-in.smms/{uuid.uuid4().hex[:8]}.png"
+            self._send(200, {"success": True, "data": {"url": url}})
+        elif path == "/bilibili/x/dynamic/feed/draw/upload_bfs":
+            url = f"https://stand-in.hdslb/bfs/new_dyn/{uuid.uuid4().hex}.png"
+            self._send(200, {"code": 0, "data": {"image_url": url}})
+        else:
+            self._send(404, {"message": "Not Found"})
+
+    do_GET = do_POST = do_PUT = do_PATCH = _handle
+
+    def _github(self, path: str, body: bytes) -> Tuple[int, Any]:
+        repo = self.repo
+        method = self.command
+        with repo.lock:
+            m = re.fullmatch(r"/repos/[^/]+/[^/]+/contents/(.+)", path)
+            if m:
+                rel = m.group(1)
+                if method == "GET":
+                    sha = repo.files.get(rel)
+                    return (200, {"sha": sha}) if sha else (404, {"message": "Not Found"})
+                content = json.loads(body or b"{}")
+                sha = hashlib.sha1(content.get("content", "").encode("ascii")).hexdigest()
+                repo.files[rel] = sha
+                return 201, {"content": {"sha": sha, "download_url": f"https://stand-in.github/{rel}"}}
+            if re.fullmatch(r"/repos/[^/]+/[^/]+/git/trees/[^/]+", path) and method == "GET":
+                tree = [{"path": p, "sha": s, "type": "blob"} for p, s in repo.files.items()]
+                return 200, {"sha": repo.head, "tree": tree, "truncated": False}
+            if re.fullmatch(r"/repos/[^/]+/[^/]+/git/refs/heads/.+", path):
+                if method == "PATCH":
+                    repo.head = json.loads(body)["sha"]
+                return 200, {"object": {"sha": repo.head}}
+            m = re.fullmatch(r"/repos/[^/]+/[^/]+/git/(blobs|trees|commits)(?:/(\w+))?", path)
+            if m and method == "GET" and m.group(1) == "commits":
+                return 200, {"sha": m.group(2), "tree": {"sha": repo.objects.get(m.group(2), repo.head)}}
+            if m and method == "POST":
+                sha = hashlib.sha1(body).hexdigest()
+                if m.group(1) == "trees":
+                    for entry in json.loads(body).get("tree", []):
+                        repo.files[entry["path"]] = entry["sha"]
+                if m.group(1) == "commits":
+                    repo.objects[sha] = json.loads(body).get("tree")
+                return 201, {"sha": sha}
+        return 404, {"message": "Not Found"}
+
+
+def start(behaviour: Behaviour | None = None, port: int = 0) -> ThreadingHTTPServer:
+    handler = type("Handler", (StandInHandler,), {"behaviour": behaviour or Behaviour(), "repo": _GitHubRepo()})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve the stand-in image host APIs")
+    parser.add_argument("--port", type=int, default=8800)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--bandwidth", type=float, default=0.0, help="bytes/s per request, 0 = unlimited")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    server = start(Behaviour(args.latency, args.bandwidth, args.error_rate, args.rate_limit_rate), args.port)
+    print(f"stand-ins on http://127.0.0.1:{server.server_port}/{{github,smms,bilibili}}", flush=True)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+# N processes each do M mock uploads against one ~/.pypicgo-style directory, the way the
+# tray, the API server and CLI runs share it. Each upload also bumps a per-process counter
+# in config.json. Passes if exactly N x M history records and every counter survive.
+
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from pypicgo.core.config import ConfigManager
+from pypicgo.core.history import open_history
+
+
+def worker(base: Path, name: str, uploads: int, touch_config: bool) -> None:
+    from pypicgo.core import PicGoCore
+
+    core = PicGoCore(base)
+    src = base / f"{name}.png"
+    src.write_bytes(b"\x89PNG\r\n\x1a\n" + name.encode())
+    for i in range(uploads):
+        core.run([str(src)], host="mock", use_cache=False, clipboard=False)
+        if touch_config:
+            core.config.set_global_config({f"stress_{name}": i + 1})
+    # Pending write-behind records are flushed at exit
+
+
+def run(args: argparse.Namespace, backend: str) -> bool:
+    with tempfile.TemporaryDirectory() as tmp:
+        base = Path(tmp)
+        config = ConfigManager(base)
+        config.set_global_config({"history_backend": backend, "copy_to_clipboard": False})
+        config.set_host_config("mock", {"delay": "0"})
+
+        start = time.perf_counter()
+        procs = [
+            subprocess.Popen(
+                [sys.executable, __file__, "--worker", str(base), f"w{n}", str(args.uploads)]
+                + ([] if args.no_config else ["--touch-config"])
+            )
+            for n in range(args.procs)
+        ]
+        failed = sum(p.wait() != 0 for p in procs)
+        elapsed = time.perf_counter() - start
+
+        records = open_history(base, backend).list()
+        expected = args.procs * args.uploads
+        counters = json.loads((base / "config.json").read_text(encoding="utf-8"))
+        lost = [] if args.no_config else [
+            f"w{n}" for n in range(args.procs) if counters.get(f"stress_w{n}") != args.uploads
+        ]
+        ok = not failed and len(records) == expected and not lost
+        print(
+            f"{backend:>7}: {len(records)}/{expected} records, {args.procs - failed}/{args.procs} workers ok,"
+            f" lost config updates: {', '.join(lost) or 'none'}, {elapsed:.2f}s"
+            f" -> {'PASS' if ok else 'FAIL'}"
+        )
+        return ok
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Concurrent history/config writers across processes")
+    parser.add_argument("--procs", type=int, default=8)
+    parser.add_argument("--uploads", type=int, default=50, help="uploads per process")
+    parser.add_argument("--backend", choices=["jsonl", "sqlite", "both"], default="both")
+    parser.add_argument("--no-config", action="store_true", help="don't write config.json from the workers")
+    parser.add_argument("--worker", nargs=3, metavar=("BASE", "NAME", "UPLOADS"), help=argparse.SUPPRESS)
+    parser.add_argument("--touch-config", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        base, name, uploads = args.worker
+        worker(Path(base), name, int(uploads), args.touch_config)
+        return
+
+    backends = ["jsonl", "sqlite"] if args.backend == "both" else [args.backend]
+    results = [run(args, backend) for backend in backends]
+    sys.exit(0 if all(results) else 1)
+
+
+if __name__ == "__main__":
+    main()
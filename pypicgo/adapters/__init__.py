@@ -1,7 +1,30 @@
-from .base import UploaderAdapter, register_adapter, get_adapter
-from .github import GitHubAdapter  # register side-effect
-from .smms import SMMSAdapter  # register side-effect
-from .bilibili import BilibiliAdapter  # register side-effect
-from .mock import MockUploader  # register side-effect
+from .base import UploaderAdapter, register_adapter, register_lazy_adapter, get_adapter, adapter_names
+from .source import MemoryFile, Source
 
-__all__ = ["UploaderAdapter", "register_adapter", "get_adapter"]
+# Built-in adapters are imported on first use (see base._lazy); the classes stay
+# importable from here for code that refers to them directly
+_ADAPTER_MODULES = {
+    "GitHubAdapter": ".github",
+    "SMMSAdapter": ".smms",
+    "BilibiliAdapter": ".bilibili",
+    "MockUploader": ".mock",
+}
+
+
+def __getattr__(name: str):
+    if name in _ADAPTER_MODULES:
+        import importlib
+
+        return getattr(importlib.import_module(_ADAPTER_MODULES[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+__all__ = [
+    "UploaderAdapter",
+    "register_adapter",
+    "register_lazy_adapter",
+    "get_adapter",
+    "adapter_names",
+    "MemoryFile",
+    "Source",
+]
@@ -1,18 +1,98 @@
 from __future__ import annotations
 
+import importlib
+import time
 from abc import ABC, abstractmethod
-from typing import Dict, List, Any, Callable
+from pathlib import Path
+from typing import Dict, Iterator, List, Any, Callable, Tuple
+
+from .source import Source
+from .ratelimit import acquire_current
+from .retry import get_policy
+from .transport import HTTPStatusError, Response, get_pool
+from ..utils.metrics import REQUEST_SECONDS
 
 _registry: Dict[str, "UploaderAdapter"] = {}
+# Where adapters keep data between runs; set by the core from its config directory
+_state_dir: Path | None = None
+# Adapters whose module is imported (and registers itself) on first get_adapter()
+_lazy: Dict[str, str] = {
+    "github": "pypicgo.adapters.github",
+    "smms": "pypicgo.adapters.smms",
+    "bilibili": "pypicgo.adapters.bilibili",
+    "mock": "pypicgo.adapters.mock",
+}
 
 
 class UploaderAdapter(ABC):
     name: str
+    # Default cap on simultaneous upload() calls; overridden by hosts.<name>.max_concurrency
+    max_concurrency: int = 4
+    # Config key identifying the account, so each account gets its own rate limit
+    account_field: str | None = None
+    # Config keys that decide where an upload ends up (repo, branch, endpoint, ...)
+    destination_fields: Tuple[str, ...] = ()
 
     @abstractmethod
-    def upload(self, files: List[str], config: Dict[str, Any]) -> List[str]:
+    def upload(self, files: List[Source], config: Dict[str, Any]) -> List[str]:
         ...
 
+    def upload_iter(self, files: List[Source], config: Dict[str, Any]) -> Iterator[str]:
+        # Yields the URL for each file in order as soon as it is uploaded, so the core can
+        # act on it (and keep it) even if a later file fails. Adapters that upload file
+        # by file override this and build upload() on it; the default waits for upload().
+        yield from self.upload(files, config)
+
+    def split(self, files: List[Source], config: Dict[str, Any]) -> List[List[Source]]:
+        # Units of work the core may upload in parallel; one file per batch by default
+        return [[f] for f in files]
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        headers: Dict[str, str] | None = None,
+        body: Any = None,
+        idempotent: bool | None = None,
+    ) -> Response:
+        # All adapter HTTP goes through the shared keep-alive pool, with retries and a
+        # circuit breaker per host. idempotent=None decides from the method (POST/PATCH
+        # are only resent when the server provably didn't act on them).
+        def send() -> Response:
+            acquire_current()  # every attempt, retries included, spends a rate-limit token
+            start = time.perf_counter()
+            status = "error"
+            try:
+                resp = get_pool().request(method, url, headers=headers, body=body)
+                status = str(resp.status)
+                return resp
+            except HTTPStatusError as e:
+                status = str(e.status)
+                raise
+            finally:
+                REQUEST_SECONDS.observe(time.perf_counter() - start, self.name, method, status)
+
+        return get_policy().call(self.name, method, send, idempotent)
+
+    def account(self, config: Dict[str, Any]) -> str:
+        return str(config.get(self.account_field) or "") if self.account_field else ""
+
+    def destination(self, config: Dict[str, Any]) -> str:
+        # Fingerprint of the upload target and account; the upload cache only reuses a
+        # URL for the same one, so changing repo, branch or token means uploading again
+        import hashlib
+
+        values = [str(config.get(key) or "") for key in self.destination_fields] + [self.account(config)]
+        return hashlib.sha256("\0".join(values).encode("utf-8")).hexdigest()[:16]
+
+    def state_dir(self) -> Path | None:
+        return _state_dir / self.name if _state_dir is not None else None
+
+
+def configure_state_dir(path: Path) -> None:
+    global _state_dir
+    _state_dir = path
+
 
 def register_adapter(name: str):
     def decorator(cls):
@@ -21,6 +101,19 @@ def register_adapter(name: str):
     return decorator
 
 
+def register_lazy_adapter(name: str, module: str) -> None:
+    # For plugins: defer importing an adapter module until the host is used
+    _lazy[name] = module
+
+
 def get_adapter(name: str) -> UploaderAdapter | None:
-    return _registry.get(name)
+    adapter = _registry.get(name)
+    if adapter is None and name in _lazy:
+        importlib.import_module(_lazy[name])
+        adapter = _registry.get(name)
+    return adapter
+
+
+def adapter_names() -> List[str]:
+    return sorted(set(_registry) | set(_lazy))
 
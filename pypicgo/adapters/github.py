@@ -1,13 +1,25 @@
 from __future__ import annotations
 
 import base64
+import hashlib
+import http.client
 import json
-import urllib.request
-from dataclasses import dataclass
+import os
+import tempfile
+import threading
+import time
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Dict, List, Any
+from typing import Any, Dict, Iterator, List, Tuple
+from urllib.parse import quote
 
 from .base import UploaderAdapter, register_adapter
+from .source import Source, read_source, source_name
+from .transport import HTTPStatusError
+
+API = "https://api.github.com"
+# Attempts at moving the branch ref when another push lands between reading and updating it
+_REF_ATTEMPTS = 3
 
 
 @dataclass
@@ -16,45 +28,231 @@ class GitHubConfig:
     branch: str = "main"
     token: str = ""
     path: str = ""
+    batch_threshold: int = 5
+    tree_cache: bool = True
+    # Seconds a fetched tree is trusted without asking GitHub again
+    tree_ttl: float = 60.0
+    # Overridable so benchmarks and GitHub Enterprise can point elsewhere
+    api_base: str = API
+
+
+@dataclass
+class _TreeCache:
+    # path -> blob SHA of the branch tip, revalidated with If-None-Match
+    etag: str = ""
+    shas: Dict[str, str] = field(default_factory=dict)
+    # GitHub truncates very large recursive trees; then absence from shas proves nothing
+    truncated: bool = False
+    # time.time() of the last fetch or 304; our own commits update shas in place
+    fetched: float = 0.0
+
+
+def git_blob_sha(content: bytes) -> str:
+    return hashlib.sha1(b"blob %d\0" % len(content) + content).hexdigest()
 
 
 @register_adapter("github")
 class GitHubAdapter(UploaderAdapter):
     name = "github"
+    account_field = "token"
+    destination_fields = ("repo", "branch", "path", "api_base")
+    # Each contents-API PUT is a commit on the same branch; parallel PUTs race with 409s
+    max_concurrency = 1
+
+    def __init__(self) -> None:
+        self._trees: Dict[Tuple[str, str, str, str], _TreeCache] = {}
+        self._trees_lock = threading.Lock()
 
-    def upload(self, files: List[str], config: Dict[str, Any]) -> List[str]:
-        cfg = GitHubConfig(
+    @staticmethod
+    def _config(config: Dict[str, Any]) -> GitHubConfig:
+        return GitHubConfig(
             repo=config.get("repo", ""),
             branch=config.get("branch", "main"),
             token=config.get("token", ""),
             path=config.get("path", ""),
+            batch_threshold=int(config.get("batch_threshold", 5)),
+            tree_cache=config.get("tree_cache", True) not in (False, "0", "false"),
+            tree_ttl=float(config.get("tree_ttl", 60)),
+            api_base=(config.get("api_base") or API).rstrip("/"),
         )
+
+    def _use_batch(self, files: List[Source], cfg: GitHubConfig) -> bool:
+        return 0 < cfg.batch_threshold <= len(files)
+
+    def split(self, files: List[Source], config: Dict[str, Any]) -> List[List[Source]]:
+        # Batches above the threshold go up as a single commit, so keep them together
+        if self._use_batch(files, self._config(config)):
+            return [files]
+        return super().split(files, config)
+
+    def upload(self, files: List[Source], config: Dict[str, Any]) -> List[str]:
+        return list(self.upload_iter(files, config))
+
+    def upload_iter(self, files: List[Source], config: Dict[str, Any]) -> Iterator[str]:
+        # A batch commit is all-or-nothing, so its URLs arrive together at the end
+        cfg = self._config(config)
         if not cfg.repo or not cfg.token:
             raise RuntimeError("github adapter requires repo and token")
 
         owner, repo = cfg.repo.split("/", 1)
-        urls: List[str] = []
-        for f in files:
-            p = Path(f)
-            rel = (cfg.path + "/" if cfg.path else "") + p.name
+        key = (cfg.api_base, owner, repo, cfg.branch)
+        tree = self._tree(key, cfg, self._use_batch(files, cfg)) if cfg.tree_cache else None
+        try:
+            if self._use_batch(files, cfg):
+                batch_urls = self._upload_batch(owner, repo, files, cfg, tree)
+                if batch_urls is not None:
+                    yield from batch_urls
+                    return
+            for f in files:
+                yield self._upload_one(owner, repo, f, cfg, tree)
+        finally:
+            if tree is not None:
+                self._save_tree(key, tree)
+
+    def _upload_one(self, owner: str, repo: str, f: Source, cfg: GitHubConfig, tree: _TreeCache | None) -> str:
+        rel = self._rel_path(f, cfg)
+        content = read_source(f)
+        local_sha = git_blob_sha(content)
+        if tree is not None and (rel in tree.shas or not tree.truncated):
+            sha = tree.shas.get(rel)
+        else:
+            sha = self._get_sha(owner, repo, rel, cfg)
+        if sha == local_sha:
+            # identical bytes already at this path on the branch
+            return self._raw_url(owner, repo, rel, cfg)
+        try:
+            download_url = self._put_file(owner, repo, rel, cfg, content, sha)
+        except HTTPStatusError as e:
+            # A cached SHA can be stale (someone else pushed); look it up and try once more.
+            # After a 5xx the commit may still have landed, so check before giving up.
+            stale = tree is not None and e.status in (409, 422)
+            if not stale and e.status < 500:
+                raise
             sha = self._get_sha(owner, repo, rel, cfg)
-            download_url = self._put_file(owner, repo, rel, cfg, p.read_bytes(), sha)
-            urls.append(download_url)
-        return urls
-
-    def _request(self, method: str, url: str, token: str, data: bytes | None = None) -> Dict[str, Any]:
-        req = urllib.request.Request(url=url, data=data, method=method)
-        req.add_header("Authorization", f"token {token}")
-        req.add_header("User-Agent", "pypicgo")
-        req.add_header("Accept", "application/vnd.github+json")
+            if sha == local_sha:
+                download_url = self._raw_url(owner, repo, rel, cfg)
+            elif stale:
+                download_url = self._put_file(owner, repo, rel, cfg, content, sha)
+            else:
+                raise
+        except (OSError, http.client.HTTPException):
+            # The connection dropped after the PUT went out; it only counts if the file is there
+            if self._get_sha(owner, repo, rel, cfg) != local_sha:
+                raise
+            download_url = self._raw_url(owner, repo, rel, cfg)
+        if tree is not None:
+            with self._trees_lock:
+                tree.shas[rel] = local_sha
+        return download_url
+
+    def _tree(self, key: Tuple[str, str, str, str], cfg: GitHubConfig, batch: bool) -> _TreeCache | None:
+        # A tree younger than tree_ttl is used as is. Otherwise only a batch pays for the
+        # full recursive listing; a small upload does a cheap per-file SHA lookup instead.
+        with self._trees_lock:
+            cached = self._trees.get(key)
+        if cached is None:
+            cached = self._load_tree(key)
+            if cached is not None:
+                with self._trees_lock:
+                    cached = self._trees.setdefault(key, cached)
+        if cached is not None and time.time() - cached.fetched < cfg.tree_ttl:
+            return cached
+        if not batch:
+            return None
+        return self._refresh_tree(key, cfg, cached)
+
+    def _tree_file(self, key: Tuple[str, str, str, str]) -> Path | None:
+        state = self.state_dir()
+        if state is None:
+            return None
+        return state / f"tree-{hashlib.sha1('|'.join(key).encode('utf-8')).hexdigest()[:16]}.json"
+
+    def _load_tree(self, key: Tuple[str, str, str, str]) -> _TreeCache | None:
+        path = self._tree_file(key)
+        if path is None:
+            return None
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+            return _TreeCache(
+                etag=data.get("etag", ""),
+                shas=dict(data.get("shas", {})),
+                truncated=bool(data.get("truncated")),
+                fetched=float(data.get("fetched", 0)),
+            )
+        except (OSError, ValueError, TypeError, AttributeError):
+            return None
+
+    def _save_tree(self, key: Tuple[str, str, str, str], tree: _TreeCache) -> None:
+        # Shared with later CLI runs, which would otherwise each fetch the whole tree
+        path = self._tree_file(key)
+        if path is None:
+            return
+        with self._trees_lock:
+            payload = json.dumps(
+                {"etag": tree.etag, "shas": tree.shas, "truncated": tree.truncated, "fetched": tree.fetched}
+            )
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(prefix=".tree-", suffix=".tmp", dir=str(path.parent))
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(payload)
+            os.replace(tmp, path)
+        except OSError:
+            pass  # only a cache
+
+    def _refresh_tree(
+        self, key: Tuple[str, str, str, str], cfg: GitHubConfig, cached: _TreeCache | None
+    ) -> _TreeCache | None:
+        _, owner, repo, _ = key
+        headers = {
+            "Authorization": f"token {cfg.token}",
+            "User-Agent": "pypicgo",
+            "Accept": "application/vnd.github+json",
+        }
+        if cached is not None and cached.etag:
+            headers["If-None-Match"] = cached.etag
+        url = f"{cfg.api_base}/repos/{owner}/{repo}/git/trees/{quote(cfg.branch)}?recursive=1"
+        try:
+            resp = self.request("GET", url, headers)
+        except Exception:
+            # empty repo, missing branch or network trouble: use per-file lookups this time
+            return None
+        if resp.status == 304 and cached is not None:
+            cached.fetched = time.time()
+            return cached
+        data = resp.json()
+        tree = _TreeCache(
+            etag=resp.headers.get("ETag") or "",
+            shas={e["path"]: e["sha"] for e in data.get("tree", []) if e.get("type") == "blob"},
+            truncated=bool(data.get("truncated")),
+            fetched=time.time(),
+        )
+        with self._trees_lock:
+            self._trees[key] = tree
+        return tree
+
+    @staticmethod
+    def _rel_path(src: Source, cfg: GitHubConfig) -> str:
+        return (cfg.path + "/" if cfg.path else "") + source_name(src)
+
+    @staticmethod
+    def _raw_url(owner: str, repo: str, path: str, cfg: GitHubConfig) -> str:
+        return f"https://raw.githubusercontent.com/{owner}/{repo}/{quote(cfg.branch)}/{quote(path)}"
+
+    def _request(
+        self, method: str, url: str, token: str, data: bytes | None = None, idempotent: bool | None = None
+    ) -> Dict[str, Any]:
+        headers = {
+            "Authorization": f"token {token}",
+            "User-Agent": "pypicgo",
+            "Accept": "application/vnd.github+json",
+        }
         if data is not None:
-            req.add_header("Content-Type", "application/json")
-        with urllib.request.urlopen(req) as resp:
-            body = resp.read()
-            return json.loads(body.decode("utf-8"))
+            headers["Content-Type"] = "application/json"
+        return self.request(method, url, headers, data, idempotent=idempotent).json()
 
     def _get_sha(self, owner: str, repo: str, path: str, cfg: GitHubConfig) -> str | None:
-        url = f"https://api.github.com/repos/{owner}/{repo}/contents/{path}?ref={cfg.branch}"
+        url = f"{cfg.api_base}/repos/{owner}/{repo}/contents/{quote(path)}?ref={quote(cfg.branch)}"
         try:
             data = self._request("GET", url, cfg.token)
             return data.get("sha")
@@ -62,7 +260,7 @@ class GitHubAdapter(UploaderAdapter):
             return None
 
     def _put_file(self, owner: str, repo: str, path: str, cfg: GitHubConfig, content: bytes, sha: str | None) -> str:
-        url = f"https://api.github.com/repos/{owner}/{repo}/contents/{path}"
+        url = f"{cfg.api_base}/repos/{owner}/{repo}/contents/{quote(path)}"
         payload = {
             "message": f"upload {Path(path).name} via pypicgo",
             "content": base64.b64encode(content).decode("ascii"),
@@ -70,13 +268,75 @@ class GitHubAdapter(UploaderAdapter):
         }
         if sha:
             payload["sha"] = sha
-        data = self._request("PUT", url, cfg.token, json.dumps(payload).encode("utf-8"))
+        # Each contents PUT is a commit: a blind resend after it landed would fail on the
+        # stale SHA or commit twice, so it is only retried when it provably wasn't sent
+        data = self._request("PUT", url, cfg.token, json.dumps(payload).encode("utf-8"), idempotent=False)
         download_url = (
             (data.get("content") or {}).get("download_url")
-            or f"https://raw.githubusercontent.com/{owner}/{repo}/{cfg.branch}/{path}"
+            or self._raw_url(owner, repo, path, cfg)
         )
         return download_url
 
+    def _upload_batch(
+        self, owner: str, repo: str, files: List[Source], cfg: GitHubConfig, tree: _TreeCache | None
+    ) -> List[str] | None:
+        # Git Data API: N blobs, one tree, one commit and one ref update instead of
+        # a contents GET+PUT (and a commit) per file. None means fall back to per-file.
+        base = f"{cfg.api_base}/repos/{owner}/{repo}/git"
+        ref_url = f"{base}/refs/heads/{quote(cfg.branch)}"
+        paths = [self._rel_path(f, cfg) for f in files]
+        changed = [
+            (f, rel)
+            for f, rel in zip(files, paths)
+            if tree is None or tree.shas.get(rel) != git_blob_sha(read_source(f))
+        ]
+        if not changed:
+            return [self._raw_url(owner, repo, rel, cfg) for rel in paths]
+        try:
+            head = self._request("GET", ref_url, cfg.token)["object"]["sha"]
+        except HTTPStatusError as e:
+            if e.status in (404, 409):  # empty repo or missing branch: contents API can create it
+                return None
+            raise
+
+        # Blobs and trees are content-addressed, a duplicate commit is just unreferenced and
+        # moving the ref to the same commit twice is a no-op, so Git Data calls are resent freely
+        entries: List[Dict[str, Any]] = []
+        for f, rel in changed:
+            payload = {"content": base64.b64encode(read_source(f)).decode("ascii"), "encoding": "base64"}
+            blob = self._request("POST", f"{base}/blobs", cfg.token, json.dumps(payload).encode("utf-8"), idempotent=True)
+            entries.append({"path": rel, "mode": "100644", "type": "blob", "sha": blob["sha"]})
+
+        for attempt in range(_REF_ATTEMPTS):
+            base_tree = self._request("GET", f"{base}/commits/{head}", cfg.token)["tree"]["sha"]
+            new_tree = self._request(
+                "POST", f"{base}/trees", cfg.token,
+                json.dumps({"base_tree": base_tree, "tree": entries}).encode("utf-8"), idempotent=True,
+            )
+            commit = self._request(
+                "POST", f"{base}/commits", cfg.token,
+                json.dumps({
+                    "message": f"upload {len(files)} files via pypicgo",
+                    "tree": new_tree["sha"],
+                    "parents": [head],
+                }).encode("utf-8"),
+                idempotent=True,
+            )
+            try:
+                self._request(
+                    "PATCH", ref_url, cfg.token, json.dumps({"sha": commit["sha"]}).encode("utf-8"), idempotent=True
+                )
+                break
+            except HTTPStatusError as e:
+                # 422: the branch moved (not a fast-forward); rebuild on the new head
+                if e.status != 422 or attempt == _REF_ATTEMPTS - 1:
+                    raise
+                head = self._request("GET", ref_url, cfg.token)["object"]["sha"]
+        if tree is not None:
+            with self._trees_lock:
+                tree.shas.update((e["path"], e["sha"]) for e in entries)
+        return [self._raw_url(owner, repo, rel, cfg) for rel in paths]
+
 
 def _factory() -> UploaderAdapter:
     return GitHubAdapter()
@@ -1,19 +1,27 @@
-from typing import List
-from pathlib import Path
+from typing import Iterator, List
 import time
 import random
 from .base import UploaderAdapter, register_adapter
+from .ratelimit import acquire_current
+from .source import Source, source_name
 
 @register_adapter("mock")
 class MockUploader(UploaderAdapter):
-    def upload(self, files: List[str], config: dict) -> List[str]:
-        urls = []
+    name = "mock"
+    destination_fields = ("base_url",)
+
+    def upload(self, files: List[Source], config: dict) -> List[str]:
+        return list(self.upload_iter(files, config))
+
+    def upload_iter(self, files: List[Source], config: dict) -> Iterator[str]:
         base_url = config.get("base_url", "https://mock.example.com")
+        delay = float(config.get("delay", 0.5))
         for file in files:
+            # One simulated request per file, subject to hosts.mock.rate like a real one
+            acquire_current()
             # Simulate network delay
-            time.sleep(0.5)
+            time.sleep(delay)
             # Generate fake URL
-            filename = Path(file).name
+            filename = source_name(file)
             random_hash = "".join(random.choices("abcdef0123456789", k=8))
-            urls.append(f"{base_url}/{random_hash}/{filename}")
-        return urls
+            yield f"{base_url}/{random_hash}/{filename}"
@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import mimetypes
+import mmap
+import uuid
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple, Union
+
+from .source import MemoryFile, Source, open_source, source_name, source_size
+
+CHUNK_SIZE = 64 * 1024
+
+# Field values are bytes; file parts are a path or an in-memory upload
+Payload = Union[bytes, Source]
+
+
+class MultipartEncoder:
+    # multipart/form-data body that streams file parts in CHUNK_SIZE pieces.
+    # Re-iterable, so a request can be resent, and sized up front for Content-Length.
+
+    def __init__(self, boundary: str | None = None, use_mmap: bool = False) -> None:
+        self.boundary = boundary or uuid.uuid4().hex
+        self.use_mmap = use_mmap
+        self._parts: List[Tuple[bytes, Payload]] = []
+
+    def add_field(self, name: str, value: str) -> None:
+        head = f'--{self.boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n'
+        self._parts.append((head.encode("utf-8"), value.encode("utf-8")))
+
+    def add_file(self, name: str, src: Source | Path, filename: str | None = None, content_type: str | None = None) -> None:
+        payload: Source = src if isinstance(src, MemoryFile) else str(src)
+        filename = filename or source_name(payload)
+        mime = content_type or mimetypes.guess_type(filename)[0] or "application/octet-stream"
+        head = (
+            f"--{self.boundary}\r\n"
+            f'Content-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+            f"Content-Type: {mime}\r\n\r\n"
+        )
+        self._parts.append((head.encode("utf-8"), payload))
+
+    @property
+    def content_type(self) -> str:
+        return f"multipart/form-data; boundary={self.boundary}"
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        return {"Content-Type": self.content_type, "Content-Length": str(len(self))}
+
+    def _epilogue(self) -> bytes:
+        return f"--{self.boundary}--\r\n".encode("utf-8")
+
+    def __len__(self) -> int:
+        total = len(self._epilogue())
+        for head, payload in self._parts:
+            size = len(payload) if isinstance(payload, bytes) else source_size(payload)
+            total += len(head) + size + 2
+        return total
+
+    def __iter__(self) -> Iterator[bytes]:
+        for head, payload in self._parts:
+            yield head
+            if isinstance(payload, bytes):
+                yield payload
+            else:
+                yield from self._stream(payload)
+            yield b"\r\n"
+        yield self._epilogue()
+
+    def _stream(self, src: Source) -> Iterator[bytes]:
+        with open_source(src) as f:
+            if self.use_mmap and isinstance(src, str) and source_size(src):
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    for start in range(0, len(mm), CHUNK_SIZE):
+                        yield mm[start:start + CHUNK_SIZE]
+                return
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                yield chunk
@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Dict, Iterator, Tuple
+
+from ..utils.filelock import FileLock
+
+_UNITS = {
+    "s": 1, "sec": 1, "second": 1,
+    "m": 60, "min": 60, "minute": 60,
+    "h": 3600, "hour": 3600,
+}
+
+
+def parse_rate(value: Any) -> float:
+    # "30/min" -> 0.5 requests per second; a bare number is per second; empty or 0 = unlimited
+    if value in (None, "", 0, "0"):
+        return 0.0
+    if isinstance(value, (int, float)):
+        return float(value)
+    count, _, unit = str(value).strip().partition("/")
+    unit = unit.strip().lower().rstrip("s") or "s"
+    if unit not in _UNITS:
+        raise RuntimeError(f"invalid rate: {value!r} (expected e.g. '30/min')")
+    return float(count) / _UNITS[unit]
+
+
+class TokenBucket:
+    # Holds up to `burst` tokens, refilled at `rate` per second; each request takes one.
+    # With a state_path the bucket lives in a file guarded by a lock file, so every
+    # process using the same account draws from the same tokens.
+
+    def __init__(self, rate: float, burst: float, state_path: Path | None = None) -> None:
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.state_path = state_path
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self._file_lock = FileLock(str(state_path) + ".lock") if state_path else None
+
+    def acquire(self) -> float:
+        # Blocks until a token is available; returns the time spent waiting
+        waited = 0.0
+        while True:
+            wait = self._take_shared() if self._file_lock else self._take()
+            if wait <= 0:
+                return waited
+            time.sleep(wait)
+            waited += wait
+
+    def _refill(self, tokens: float, elapsed: float) -> float:
+        return min(self.burst, tokens + max(elapsed, 0.0) * self.rate)
+
+    def _take(self) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = self._refill(self._tokens, now - self._updated)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    def _take_shared(self) -> float:
+        assert self._file_lock is not None and self.state_path is not None
+        with self._file_lock:
+            now = time.time()  # wall clock: monotonic clocks aren't comparable across processes
+            try:
+                state = json.loads(self.state_path.read_text(encoding="utf-8"))
+                tokens = self._refill(float(state["tokens"]), now - float(state["time"]))
+            except (OSError, ValueError, KeyError):
+                tokens = self.burst
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / self.rate
+            self.state_path.write_text(json.dumps({"tokens": tokens, "time": now}), encoding="utf-8")
+            return wait
+
+
+_current: ContextVar[TokenBucket | None] = ContextVar("pypicgo_rate_bucket", default=None)
+
+
+class RateLimiter:
+    def __init__(self) -> None:
+        self.state_dir: Path | None = None
+        self._buckets: Dict[Tuple[str, str], Tuple[Tuple[float, float, bool], TokenBucket]] = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, host: str, config: Dict[str, Any], account: str = "") -> TokenBucket | None:
+        # One bucket per host and account, so two tokens for the same host are limited separately
+        rate = parse_rate(config.get("rate"))
+        if rate <= 0:
+            return None
+        burst = float(config.get("burst") or max(1.0, rate))
+        shared = config.get("rate_shared") in (True, "1", "true") and self.state_dir is not None
+        account_id = hashlib.sha256(account.encode("utf-8")).hexdigest()[:12] if account else "default"
+        key = (host, account_id)
+        settings = (rate, burst, shared)
+        with self._lock:
+            entry = self._buckets.get(key)
+            if entry is None or entry[0] != settings:
+                state_path = self.state_dir / f"{host}-{account_id}.json" if shared and self.state_dir else None
+                entry = self._buckets[key] = (settings, TokenBucket(rate, burst, state_path))
+            return entry[1]
+
+    @contextmanager
+    def scope(self, host: str, config: Dict[str, Any], account: str = "") -> Iterator[None]:
+        # Requests made by the adapter inside this block draw from the host/account bucket
+        token = _current.set(self.bucket(host, config, account))
+        try:
+            yield
+        finally:
+            _current.reset(token)
+
+
+def acquire_current() -> float:
+    bucket = _current.get()
+    return bucket.acquire() if bucket is not None else 0.0
+
+
+_limiter = RateLimiter()
+
+
+def get_limiter() -> RateLimiter:
+    return _limiter
+
+
+def configure_ratelimit(state_dir: Path) -> None:
+    _limiter.state_dir = state_dir
@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+import http.client
+import random
+import socket
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Dict
+
+from .transport import HTTPStatusError, Response
+
+IDEMPOTENT_METHODS = ("GET", "HEAD", "OPTIONS", "PUT", "DELETE")
+# Worth retrying for any idempotent request
+RETRY_STATUSES = (408, 429, 500, 502, 503, 504)
+# The server refused the request without acting on it, so even a POST may be resent
+REFUSED_STATUSES = (429, 503)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(RuntimeError):
+    def __init__(self, host: str, retry_in: float, last_error: str = "") -> None:
+        super().__init__(f"{host} is unavailable ({last_error}); next attempt allowed in {retry_in:.1f}s")
+        self.host = host
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    # closed -> open after failure_threshold consecutive failures; after reset_timeout
+    # one probe request is let through (half open) and its outcome closes or reopens it
+
+    def __init__(self, host: str, failure_threshold: int = 5, reset_timeout: float = 30.0) -> None:
+        self.host = host
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.last_error = ""
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> None:
+        with self._lock:
+            if self.state == CLOSED:
+                return
+            remaining = self.opened_at + self.reset_timeout - time.monotonic()
+            if self.state == OPEN and remaining <= 0:
+                self.state = HALF_OPEN
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return
+            raise CircuitOpenError(self.host, max(remaining, 0.0), self.last_error)
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self, error: BaseException) -> None:
+        with self._lock:
+            self.failures += 1
+            self.last_error = str(error)
+            self._probing = False
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+
+    def release(self) -> None:
+        # The call failed for a reason unrelated to the host; let another request probe
+        with self._lock:
+            self._probing = False
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            info: Dict[str, Any] = {"state": self.state, "failures": self.failures}
+            if self.state != CLOSED:
+                info["retry_in"] = round(max(self.opened_at + self.reset_timeout - time.monotonic(), 0.0), 1)
+                info["last_error"] = self.last_error
+            return info
+
+
+class RetryPolicy:
+    def __init__(
+        self,
+        attempts: int = 4,
+        base_delay: float = 0.5,
+        max_delay: float = 30.0,
+        max_wait: float = 120.0,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+    ) -> None:
+        self.configure(
+            attempts=attempts,
+            base_delay=base_delay,
+            max_delay=max_delay,
+            max_wait=max_wait,
+            failure_threshold=failure_threshold,
+            reset_timeout=reset_timeout,
+        )
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def configure(self, **cfg: Any) -> None:
+        if cfg.get("attempts") is not None:
+            self.attempts = max(1, int(cfg["attempts"]))
+        if cfg.get("base_delay") is not None:
+            self.base_delay = float(cfg["base_delay"])
+        if cfg.get("max_delay") is not None:
+            self.max_delay = float(cfg["max_delay"])
+        if cfg.get("max_wait") is not None:
+            # a server asking us to wait longer than this fails the request instead
+            self.max_wait = float(cfg["max_wait"])
+        if cfg.get("failure_threshold") is not None:
+            self.failure_threshold = max(1, int(cfg["failure_threshold"]))
+        if cfg.get("reset_timeout") is not None:
+            self.reset_timeout = float(cfg["reset_timeout"])
+
+    def breaker(self, host: str) -> CircuitBreaker:
+        with self._lock:
+            breaker = self._breakers.get(host)
+            if breaker is None:
+                breaker = self._breakers[host] = CircuitBreaker(host, self.failure_threshold, self.reset_timeout)
+            return breaker
+
+    def states(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            breakers = list(self._breakers.values())
+        return {b.host: b.snapshot() for b in breakers}
+
+    def backoff(self, attempt: int) -> float:
+        # full jitter: spreads out clients that failed together
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def call(self, host: str, method: str, send: Callable[[], Response], idempotent: bool | None = None) -> Response:
+        if idempotent is None:
+            idempotent = method.upper() in IDEMPOTENT_METHODS
+        breaker = self.breaker(host)
+        attempt = 0
+        while True:
+            breaker.allow()
+            try:
+                resp = send()
+            except HTTPStatusError as e:
+                if e.status >= 500 or e.status == 408:
+                    breaker.record_failure(e)
+                else:
+                    # 4xx, rate limits included, means the host is up and answering
+                    breaker.record_success()
+                delay = server_delay(e.response)
+                if idempotent:
+                    retryable = e.status in RETRY_STATUSES or delay is not None
+                else:
+                    retryable = e.status in REFUSED_STATUSES or (e.status == 403 and delay is not None)
+                wait = delay if delay is not None else self.backoff(attempt)
+                if not retryable or wait > self.max_wait or attempt + 1 >= self.attempts:
+                    raise
+            except (OSError, http.client.HTTPException) as e:
+                breaker.record_failure(e)
+                # a request that may have reached the server is only resent if it's idempotent
+                if not (idempotent or _not_sent(e)) or attempt + 1 >= self.attempts:
+                    raise
+                wait = self.backoff(attempt)
+            except BaseException:
+                breaker.release()
+                raise
+            else:
+                breaker.record_success()
+                return resp
+            attempt += 1
+            time.sleep(wait)
+
+
+def server_delay(resp: Response) -> float | None:
+    # Retry-After (seconds or HTTP date), or GitHub's X-RateLimit-Reset once the quota is spent
+    value = resp.headers.get("Retry-After")
+    if value:
+        value = value.strip()
+        if value.isdigit():
+            return float(value)
+        try:
+            return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+        except (TypeError, ValueError):
+            pass
+    if resp.headers.get("X-RateLimit-Remaining") == "0" and resp.headers.get("X-RateLimit-Reset", "").isdigit():
+        return max(float(resp.headers["X-RateLimit-Reset"]) - time.time(), 0.0) + 1.0
+    return None
+
+
+def _not_sent(error: OSError) -> bool:
+    return isinstance(error, (ConnectionRefusedError, socket.gaierror))
+
+
+_policy = RetryPolicy()
+
+
+def get_policy() -> RetryPolicy:
+    return _policy
+
+
+def configure_retry(cfg: Dict[str, Any]) -> None:
+    _policy.configure(**cfg)
@@ -1,45 +1,52 @@
 from __future__ import annotations
 
-import json
-import mimetypes
-import os
-import uuid
-import urllib.request
 from dataclasses import dataclass
-from pathlib import Path
-from typing import Dict, List, Any
+from typing import Any, Dict, Iterator, List
 
 from .base import UploaderAdapter, register_adapter
+from .multipart import MultipartEncoder
+from .source import Source
+
+API = "https://sm.ms/api/v2"
 
 
 @dataclass
 class SMMSConfig:
     token: str = ""
+    mmap: bool = False
+    api_base: str = API
 
 
 @register_adapter("smms")
 class SMMSAdapter(UploaderAdapter):
     name = "smms"
+    account_field = "token"
+    destination_fields = ("api_base",)
+
+    def upload(self, files: List[Source], config: Dict[str, Any]) -> List[str]:
+        return list(self.upload_iter(files, config))
 
-    def upload(self, files: List[str], config: Dict[str, Any]) -> List[str]:
-        cfg = SMMSConfig(token=config.get("token", ""))
+    def upload_iter(self, files: List[Source], config: Dict[str, Any]) -> Iterator[str]:
+        cfg = SMMSConfig(
+            token=config.get("token", ""),
+            mmap=config.get("mmap") in (True, "1", "true"),
+            api_base=(config.get("api_base") or API).rstrip("/"),
+        )
         if not cfg.token:
             raise RuntimeError("sm.ms adapter requires token")
-        urls: List[str] = []
         for f in files:
-            urls.append(self._upload_one(Path(f), cfg))
-        return urls
-
-    def _upload_one(self, path: Path, cfg: SMMSConfig) -> str:
-        boundary = uuid.uuid4().hex
-        body = self._multipart_body(boundary, path)
-        req = urllib.request.Request("https://sm.ms/api/v2/upload", data=body, method="POST")
-        req.add_header("Authorization", cfg.token)
-        req.add_header("User-Agent", "pypicgo")
-        req.add_header("Accept", "application/json")
-        req.add_header("Content-Type", f"multipart/form-data; boundary={boundary}")
-        with urllib.request.urlopen(req) as resp:
-            data = json.loads(resp.read().decode("utf-8"))
+            yield self._upload_one(f, cfg)
+
+    def _upload_one(self, src: Source, cfg: SMMSConfig) -> str:
+        form = MultipartEncoder(use_mmap=cfg.mmap)
+        form.add_file("smfile", src)
+        headers = {
+            "Authorization": cfg.token,
+            "User-Agent": "pypicgo",
+            "Accept": "application/json",
+            **form.headers,
+        }
+        data = self.request("POST", f"{cfg.api_base}/upload", headers, form).json()
         if data.get("success"):
             return (data.get("data") or {}).get("url")
         # fallback for duplicate image\n
@@ -47,19 +54,6 @@ class SMMSAdapter(UploaderAdapter):
             return (data.get("images") or "")
         raise RuntimeError(f"sm.ms upload failed: {data}")
 
-    def _multipart_body(self, boundary: str, path: Path) -> bytes:
-        mime = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
-        parts: List[bytes] = []
-        parts.append(f"--{boundary}\r\n".encode("utf-8"))
-        parts.append(
-            f'Content-Disposition: form-data; name="smfile"; filename="{path.name}"\r\n'.encode("utf-8")
-        )
-        parts.append(f"Content-Type: {mime}\r\n\r\n".encode("utf-8"))
-        parts.append(path.read_bytes())
-        parts.append("\r\n".encode("utf-8"))
-        parts.append(f"--{boundary}--\r\n".encode("utf-8"))
-        return b"".join(parts)
-
 
 def _factory() -> UploaderAdapter:
     return SMMSAdapter()
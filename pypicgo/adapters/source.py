@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import io
+import os
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import BinaryIO, Iterator, Union
+
+
+@dataclass
+class MemoryFile:
+    # An upload that never touched the local filesystem: raw bytes, or a seekable
+    # binary stream such as a SpooledTemporaryFile that spills to disk when large.
+    name: str
+    data: Union[bytes, BinaryIO]
+
+    def close(self) -> None:
+        if not isinstance(self.data, (bytes, bytearray)):
+            self.data.close()
+
+
+# Everything the pipeline accepts as an input file
+Source = Union[str, MemoryFile]
+
+
+def source_name(src: Source) -> str:
+    if isinstance(src, MemoryFile):
+        return src.name
+    return os.path.basename(src)
+
+
+def source_label(src: Source) -> str:
+    # What gets written to history: the path for files, the name for in-memory uploads
+    return src.name if isinstance(src, MemoryFile) else src
+
+
+def source_size(src: Source) -> int:
+    if not isinstance(src, MemoryFile):
+        return os.path.getsize(src)
+    if isinstance(src.data, (bytes, bytearray)):
+        return len(src.data)
+    pos = src.data.tell()
+    size = src.data.seek(0, io.SEEK_END)
+    src.data.seek(pos)
+    return size
+
+
+@contextmanager
+def open_source(src: Source) -> Iterator[BinaryIO]:
+    if not isinstance(src, MemoryFile):
+        with open(src, "rb") as f:
+            yield f
+    elif isinstance(src.data, (bytes, bytearray)):
+        yield io.BytesIO(src.data)
+    else:
+        # Shared stream: rewind for every reader and leave it open for the next one
+        src.data.seek(0)
+        yield src.data
+
+
+def read_source(src: Source) -> bytes:
+    if isinstance(src, MemoryFile) and isinstance(src.data, (bytes, bytearray)):
+        return bytes(src.data)
+    with open_source(src) as f:
+        return f.read()
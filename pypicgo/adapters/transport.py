@@ -0,0 +1,202 @@
+from __future__ import annotations
+
+import http.client
+import json
+import threading
+import time
+import urllib.request
+from dataclasses import dataclass
+from typing import Any, Dict, List, Tuple
+from urllib.parse import urljoin, urlsplit
+
+Origin = Tuple[str, str, int]
+
+_REDIRECTS = (301, 302, 303, 307, 308)
+_MAX_REDIRECTS = 5
+# Errors that mean a pooled connection was closed by the server while idle
+_STALE_ERRORS = (http.client.RemoteDisconnected, http.client.BadStatusLine, BrokenPipeError, ConnectionResetError)
+# Safe to send again after a reused connection dropped while waiting for the response.
+# Anything else may already have been acted on; RetryPolicy decides whether to resend it.
+_SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+@dataclass
+class Response:
+    status: int
+    headers: http.client.HTTPMessage
+    body: bytes
+    url: str
+
+    def json(self) -> Any:
+        return json.loads(self.body.decode("utf-8"))
+
+    def text(self) -> str:
+        return self.body.decode("utf-8", errors="replace")
+
+
+class HTTPStatusError(RuntimeError):
+    def __init__(self, method: str, response: Response) -> None:
+        super().__init__(f"{method} {response.url} failed with HTTP {response.status}")
+        self.response = response
+        self.status = response.status
+        self.headers = response.headers
+        self.body = response.body
+
+
+class ConnectionPool:
+    def __init__(self, pool_size: int = 4, timeout: float = 60.0, idle_timeout: float = 60.0) -> None:
+        # pool_size bounds the idle keep-alive connections kept per origin; busy ones are not capped here
+        self.pool_size = max(0, int(pool_size))
+        self.timeout = float(timeout)
+        self.idle_timeout = float(idle_timeout)
+        self._lock = threading.Lock()
+        self._idle: Dict[Origin, List[Tuple[http.client.HTTPConnection, float]]] = {}
+        # Closes idle connections once they expire, so a long-running tray or API server
+        # doesn't hold sockets to hosts it stopped talking to
+        self._reaper: threading.Timer | None = None
+
+    def configure(self, pool_size: int | None = None, timeout: float | None = None, idle_timeout: float | None = None) -> None:
+        if pool_size is not None:
+            self.pool_size = max(0, int(pool_size))
+        if timeout is not None:
+            self.timeout = float(timeout)
+        if idle_timeout is not None:
+            self.idle_timeout = float(idle_timeout)
+
+    def _new_connection(self, origin: Origin) -> http.client.HTTPConnection:
+        scheme, host, port = origin
+        proxy = urllib.request.getproxies().get(scheme)
+        if proxy and not urllib.request.proxy_bypass(host):
+            p = urlsplit(proxy if "://" in proxy else f"http://{proxy}")
+            # HTTPS is tunnelled with CONNECT; plain HTTP is sent to the proxy with an absolute URL
+            if scheme == "https":
+                tunnel = http.client.HTTPSConnection(p.hostname or "", p.port or 80, timeout=self.timeout)
+                tunnel.set_tunnel(host, port)
+                return tunnel
+            return http.client.HTTPConnection(p.hostname or "", p.port or 80, timeout=self.timeout)
+        if scheme == "https":
+            return http.client.HTTPSConnection(host, port, timeout=self.timeout)
+        return http.client.HTTPConnection(host, port, timeout=self.timeout)
+
+    def _acquire(self, origin: Origin) -> Tuple[http.client.HTTPConnection, bool]:
+        now = time.monotonic()
+        with self._lock:
+            idle = self._idle.get(origin, [])
+            while idle:
+                conn, last_used = idle.pop()
+                if now - last_used < self.idle_timeout:
+                    return conn, True
+                conn.close()
+        return self._new_connection(origin), False
+
+    def _release(self, origin: Origin, conn: http.client.HTTPConnection) -> None:
+        with self._lock:
+            idle = self._idle.setdefault(origin, [])
+            if len(idle) < self.pool_size:
+                idle.append((conn, time.monotonic()))
+                self._schedule_reap()
+                return
+        conn.close()
+
+    def _schedule_reap(self) -> None:
+        # Caller holds _lock
+        if self._reaper is None:
+            self._reaper = threading.Timer(self.idle_timeout, self._reap)
+            self._reaper.daemon = True
+            self._reaper.start()
+
+    def _reap(self) -> None:
+        with self._lock:
+            self._reaper = None
+        self.evict_idle()
+        with self._lock:
+            if self._idle:
+                self._schedule_reap()
+
+    def evict_idle(self) -> None:
+        now = time.monotonic()
+        expired: List[http.client.HTTPConnection] = []
+        with self._lock:
+            for origin, idle in list(self._idle.items()):
+                expired += [c for c, t in idle if now - t >= self.idle_timeout]
+                idle[:] = [(c, t) for c, t in idle if now - t < self.idle_timeout]
+                if not idle:
+                    del self._idle[origin]
+        for conn in expired:
+            conn.close()
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, {}
+            if self._reaper is not None:
+                self._reaper.cancel()
+                self._reaper = None
+        for conns in idle.values():
+            for conn, _ in conns:
+                conn.close()
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        headers: Dict[str, str] | None = None,
+        body: Any = None,
+    ) -> Response:
+        for _ in range(_MAX_REDIRECTS + 1):
+            resp = self._send(method, url, headers or {}, body)
+            location = resp.headers.get("Location")
+            if resp.status in _REDIRECTS and location and method in ("GET", "HEAD"):
+                url = urljoin(url, location)
+                continue
+            if resp.status >= 400:
+                raise HTTPStatusError(method, resp)
+            return resp
+        raise HTTPStatusError(method, resp)
+
+    def _send(self, method: str, url: str, headers: Dict[str, str], body: Any) -> Response:
+        parts = urlsplit(url)
+        scheme = parts.scheme or "https"
+        origin: Origin = (scheme, parts.hostname or "", parts.port or (443 if scheme == "https" else 80))
+        target = parts.path or "/"
+        if parts.query:
+            target += "?" + parts.query
+        while True:
+            conn, reused = self._acquire(origin)
+            if scheme == "http" and conn.host != origin[1]:
+                target = url
+            sent = False
+            try:
+                conn.request(method, target, body=body, headers=headers)
+                sent = True
+                resp = conn.getresponse()
+                data = resp.read()
+            except _STALE_ERRORS:
+                conn.close()
+                # A write to a connection the server had already closed never reached it;
+                # once the request is out, only a safe method is sent again here
+                if reused and (not sent or method.upper() in _SAFE_METHODS):
+                    continue
+                raise
+            except BaseException:
+                conn.close()
+                raise
+            if resp.will_close:
+                conn.close()
+            else:
+                self._release(origin, conn)
+            return Response(status=resp.status, headers=resp.headers, body=data, url=url)
+
+
+_pool = ConnectionPool()
+
+
+def get_pool() -> ConnectionPool:
+    return _pool
+
+
+def configure_pool(cfg: Dict[str, Any]) -> None:
+    _pool.configure(
+        pool_size=cfg.get("pool_size"),
+        timeout=cfg.get("timeout"),
+        idle_timeout=cfg.get("idle_timeout"),
+    )
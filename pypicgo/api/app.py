@@ -1,15 +1,24 @@
 from __future__ import annotations
 
 import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from http.server import BaseHTTPRequestHandler, HTTPServer
-from typing import Any, Dict, List
+from typing import Any, Dict, Iterable, List, Tuple
+from urllib.parse import parse_qs
 
+from ..adapters.retry import get_policy
 from ..core import PicGoCore
+from ..utils.metrics import REGISTRY
+from .jobs import JobManager, close_sources
+from .uploads import DEFAULT_SPOOL_THRESHOLD, BodyReader, generated_name, read_multipart, read_raw, safe_name
 
 
 class PypicgoHandler(BaseHTTPRequestHandler):
     server_version = "pypicgo/0.1"
-    core = PicGoCore()
+    # Shared by all worker threads; set by run_server
+    core: PicGoCore
+    jobs: JobManager
 
     def _json(self, status: int, payload: Dict[str, Any]) -> None:
         body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
@@ -19,48 +28,194 @@ class PypicgoHandler(BaseHTTPRequestHandler):
         self.end_headers()
         self.wfile.write(body)
 
+    def _json_stream(self, status: int, key: str, items: Iterable[Dict[str, Any]]) -> None:
+        # No Content-Length: the body is written as items are read and ends when the connection closes
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        buf: List[bytes] = [('{"%s": [' % key).encode("utf-8")]
+        size = 0
+        for i, item in enumerate(items):
+            chunk = (("," if i else "") + json.dumps(item, ensure_ascii=False)).encode("utf-8")
+            buf.append(chunk)
+            size += len(chunk)
+            if size >= 64 * 1024:
+                self.wfile.write(b"".join(buf))
+                buf, size = [], 0
+        buf.append(b"]}")
+        self.wfile.write(b"".join(buf))
+
     def do_GET(self) -> None:
-        if self.path == "/health":
-            self._json(200, {"status": "ok"})
+        path, _, query = self.path.partition("?")
+        if path == "/health":
+            # Per-host circuit breakers: "open" hosts fail fast until retry_in elapses
+            self._json(200, {"status": "ok", "hosts": get_policy().states()})
+            return
+        if path == "/metrics":
+            body = REGISTRY.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        if path == "/history":
+            qs = parse_qs(query)
+            try:
+                offset = int(qs.get("offset", ["0"])[0])
+                limit = int(qs["limit"][0]) if "limit" in qs else None
+                if offset < 0 or (limit is not None and limit < 0):
+                    raise ValueError("negative offset or limit")
+            except ValueError:
+                self._json(400, {"error": "invalid_pagination"})
+                return
+            items = self.core.history.query(
+                offset=offset,
+                limit=limit,
+                host=qs.get("host", [None])[0],
+                since=qs.get("since", [None])[0],
+                until=qs.get("until", [None])[0],
+                newest_first=qs.get("order", ["asc"])[0] == "desc",
+            )
+            self._json_stream(200, "history", items)
             return
-        if self.path == "/history":
-            self._json(200, {"history": self.core.history.list()})
+        if path.startswith("/jobs/"):
+            job = self.jobs.snapshot(path[len("/jobs/"):])
+            if job is None:
+                self._json(404, {"error": "job_not_found"})
+                return
+            self._json(200, job)
             return
         self._json(404, {"error": "not_found"})
 
+    def do_DELETE(self) -> None:
+        path, _, _ = self.path.partition("?")
+        if not path.startswith("/jobs/"):
+            self._json(404, {"error": "not_found"})
+            return
+        job = self.jobs.cancel(path[len("/jobs/"):])
+        if job is None:
+            self._json(404, {"error": "job_not_found"})
+            return
+        self._json(200, job)
+
+    def _upload_request(self, query: str) -> Dict[str, Any] | None:
+        # JSON {"files": [local paths]}, multipart/form-data file parts, or a raw image/* body
+        if "Content-Length" not in self.headers:
+            self._json(411, {"error": "length_required"})
+            return None
+        try:
+            length = int(self.headers["Content-Length"])
+        except ValueError:
+            length = -1
+        if length < 0:
+            self._json(400, {"error": "invalid_content_length"})
+            return None
+        reader = BodyReader(self.rfile, length)
+        threshold = int(self.core.config.data.get("server", {}).get("spool_threshold", DEFAULT_SPOOL_THRESHOLD))
+        ctype = self.headers.get_content_type()
+        qs = parse_qs(query)
+        payload: Dict[str, Any] = {}
+        files: List[Any]
+        if ctype == "multipart/form-data":
+            boundary = self.headers.get_param("boundary")
+            if not boundary:
+                self._json(400, {"error": "missing_boundary"})
+                return None
+            files, payload = read_multipart(reader, str(boundary), threshold)
+        elif ctype.startswith("image/") or ctype == "application/octet-stream":
+            name = qs.get("name", [None])[0] or self.headers.get("X-Filename") or ""
+            files = [read_raw(reader, safe_name(name) or generated_name(ctype), threshold)]
+        else:
+            try:
+                payload = json.loads(reader.read(reader.remaining).decode("utf-8"))
+            except Exception:
+                self._json(400, {"error": "invalid_json"})
+                return None
+            files = payload.get("files") or []
+        # parse query string
+        no_cache = qs.get("no_cache", ["0"])[0] in ("1", "true") or payload.get("no_cache") in (True, "1", "true")
+        return {
+            "files": files,
+            "host": qs.get("host", [None])[0] or payload.get("host"),
+            "fmt": qs.get("format", [None])[0] or payload.get("format"),
+            "use_cache": not no_cache,
+        }
+
     def do_POST(self) -> None:
         path, _, query = self.path.partition("?")
-        if path != "/upload":
+        if path not in ("/upload", "/jobs"):
             self._json(404, {"error": "not_found"})
             return
-        length = int(self.headers.get("Content-Length", "0"))
-        data = self.rfile.read(length)
-        try:
-            payload = json.loads(data.decode("utf-8"))
-        except Exception:
-            self._json(400, {"error": "invalid_json"})
+        req = self._upload_request(query)
+        if req is None:
+            return
+        if path == "/jobs":
+            job = self.jobs.submit(**req)
+            self._json(202, {"id": job.id, "status": job.status})
             return
-        files: List[str] = payload.get("files") or []
-        # parse query string
-        from urllib.parse import parse_qs
-        qs = parse_qs(query)
-        host = qs.get("host", [None])[0] or payload.get("host")
-        fmt = qs.get("format", [None])[0] or payload.get("format")
         try:
-            text = self.core.run(files, host=host, fmt=fmt)
+            text = self.core.run(**req)
             self._json(200, {"text": text})
         except Exception as e:
             self._json(500, {"error": str(e)})
+        finally:
+            close_sources(req["files"])
+
+
+class PooledHTTPServer(HTTPServer):
+    # Handles each connection on a bounded worker pool. When every worker is busy the
+    # accept loop waits, and further connections queue in the listen backlog.
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], handler: type, workers: int = 16, backlog: int = 64) -> None:
+        self.request_queue_size = backlog
+        super().__init__(address, handler)
+        self._slots = threading.BoundedSemaphore(workers)
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pypicgo-http")
+
+    def process_request(self, request: Any, client_address: Any) -> None:
+        self._slots.acquire()
+        self._pool.submit(self._process, request, client_address)
+
+    def _process(self, request: Any, client_address: Any) -> None:
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            self._slots.release()
+
+    def server_close(self) -> None:
+        super().server_close()
+        self._pool.shutdown(wait=False)
 
 
-def run_server(host: str = "127.0.0.1", port: int = 8765) -> None:
-    server = HTTPServer((host, port), PypicgoHandler)
+def run_server(host: str = "127.0.0.1", port: int = 8765, core: PicGoCore | None = None) -> None:
+    core = core or PicGoCore()
+    PypicgoHandler.core = core
+    jobs_cfg = core.config.data.get("jobs", {})
+    PypicgoHandler.jobs = JobManager(
+        core, workers=int(jobs_cfg.get("workers", 2)), ttl=float(jobs_cfg.get("ttl", 3600))
+    )
+    cfg = core.config.data.get("server", {})
+    server = PooledHTTPServer(
+        (host, port),
+        PypicgoHandler,
+        workers=int(cfg.get("workers", 16)),
+        backlog=int(cfg.get("backlog", 64)),
+    )
     try:
         server.serve_forever()
     except KeyboardInterrupt:
         pass
     finally:
+        PypicgoHandler.jobs.shutdown()
         server.server_close()
+        core.close()
 
 
 if __name__ == "__main__":
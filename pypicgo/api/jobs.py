@@ -0,0 +1,177 @@
+from __future__ import annotations
+
+import queue
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from ..adapters.source import MemoryFile, Source, source_label
+from ..core import PicGoCore, UploadCancelled
+from ..core.clipboard import copy_text_async
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED = (DONE, FAILED, CANCELLED)
+
+
+def close_sources(files: List[Source]) -> None:
+    for f in files:
+        if isinstance(f, MemoryFile):
+            f.close()
+
+
+@dataclass
+class Job:
+    id: str
+    files: List[Source]
+    host: str | None = None
+    fmt: str | None = None
+    use_cache: bool = True
+    status: str = QUEUED
+    urls: List[Optional[str]] = field(default_factory=list)
+    # Per file: why it has no URL, and whether that was a cancellation
+    errors: List[Optional[str]] = field(default_factory=list)
+    cancelled: List[bool] = field(default_factory=list)
+    text: str | None = None
+    error: str | None = None
+    created: float = field(default_factory=time.time)
+    finished: float | None = None
+    cancel_event: threading.Event = field(default_factory=threading.Event)
+
+    def file_status(self, index: int) -> str:
+        if self.urls[index] is not None:
+            return DONE
+        if self.errors[index] is not None:
+            return CANCELLED if self.cancelled[index] else FAILED
+        # Never reached by the run, e.g. cancelled while queued
+        return self.status if self.status in (FAILED, CANCELLED) else "pending"
+
+    def to_dict(self) -> Dict[str, Any]:
+        statuses = [self.file_status(i) for i in range(len(self.files))]
+        return {
+            "id": self.id,
+            "status": self.status,
+            "host": self.host,
+            "progress": {
+                "done": statuses.count(DONE),
+                "failed": statuses.count(FAILED),
+                "cancelled": statuses.count(CANCELLED),
+                "total": len(self.files),
+            },
+            "files": [
+                {"file": source_label(f), "status": status, "url": u, "error": e}
+                for f, status, u, e in zip(self.files, statuses, self.urls, self.errors)
+            ],
+            "text": self.text,
+            "error": self.error,
+        }
+
+
+class JobManager:
+    def __init__(self, core: PicGoCore, workers: int = 2, ttl: float = 3600) -> None:
+        self.core = core
+        self.ttl = float(ttl)
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+        self._queue: "queue.Queue[Job | None]" = queue.Queue()
+        self._workers = [
+            threading.Thread(target=self._worker, name=f"pypicgo-job-{i}", daemon=True)
+            for i in range(max(1, workers))
+        ]
+        for t in self._workers:
+            t.start()
+
+    def submit(self, files: List[Source], host: str | None = None, fmt: str | None = None, use_cache: bool = True) -> Job:
+        job = Job(id=uuid.uuid4().hex, files=list(files), host=host, fmt=fmt, use_cache=use_cache)
+        job.urls = [None] * len(job.files)
+        job.errors = [None] * len(job.files)
+        job.cancelled = [False] * len(job.files)
+        with self._lock:
+            self._expire()
+            self._jobs[job.id] = job
+        self._queue.put(job)
+        return job
+
+    def snapshot(self, job_id: str) -> Dict[str, Any] | None:
+        with self._lock:
+            self._expire()
+            job = self._jobs.get(job_id)
+            return job.to_dict() if job else None
+
+    def cancel(self, job_id: str) -> Dict[str, Any] | None:
+        # In-flight files finish; files not yet started are skipped
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            if job.status not in FINISHED:
+                job.cancel_event.set()
+                if job.status == QUEUED:
+                    self._finish(job, CANCELLED)
+            return job.to_dict()
+
+    def shutdown(self) -> None:
+        for _ in self._workers:
+            self._queue.put(None)
+
+    def _finish(self, job: Job, status: str, error: str | None = None) -> None:
+        job.status = status
+        job.error = error
+        job.finished = time.time()
+
+    def _expire(self) -> None:
+        # Caller holds _lock; finished jobs are kept for ttl seconds so clients can poll results
+        cutoff = time.time() - self.ttl
+        for job_id in [j.id for j in self._jobs.values() if j.finished is not None and j.finished < cutoff]:
+            del self._jobs[job_id]
+
+    def _worker(self) -> None:
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            try:
+                self._run(job)
+            finally:
+                close_sources(job.files)
+
+    def _run(self, job: Job) -> None:
+        with self._lock:
+            if job.status != QUEUED:
+                return
+            job.status = RUNNING
+
+        # Streamed so that one failed file neither stops the others nor hides which file it was
+        outputs: List[Optional[str]] = [None] * len(job.files)
+        try:
+            for result in self.core.run_iter(
+                job.files, host=job.host, fmt=job.fmt, use_cache=job.use_cache, cancel=job.cancel_event
+            ):
+                with self._lock:
+                    if result.url is not None:
+                        job.urls[result.index] = result.url
+                        outputs[result.index] = result.output
+                    if result.error is not None and result.url is None:
+                        job.errors[result.index] = str(result.error)
+                        job.cancelled[result.index] = isinstance(result.error, UploadCancelled)
+        except Exception as e:
+            with self._lock:
+                self._finish(job, FAILED, str(e))
+            return
+        text = "\n".join(o for o in outputs if o)
+        if text and not job.cancel_event.is_set() and self.core.config.data.get("copy_to_clipboard", True):
+            copy_text_async(text)
+        with self._lock:
+            job.text = text
+            failed = sum(e is not None and not c for e, c in zip(job.errors, job.cancelled))
+            if job.cancel_event.is_set():
+                self._finish(job, CANCELLED)
+            elif failed:
+                self._finish(job, FAILED, f"{failed} of {len(job.files)} files failed")
+            else:
+                self._finish(job, DONE)
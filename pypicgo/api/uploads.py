@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import mimetypes
+import os
+import tempfile
+import uuid
+from datetime import datetime
+from email.message import Message
+from typing import BinaryIO, Dict, List, Tuple
+
+from ..adapters.source import MemoryFile
+
+DEFAULT_SPOOL_THRESHOLD = 8 * 1024 * 1024
+_CHUNK = 64 * 1024
+
+
+class BodyReader:
+    # Reads at most Content-Length bytes from the request stream
+    def __init__(self, fp: BinaryIO, length: int) -> None:
+        self.fp = fp
+        self.remaining = length
+
+    def read(self, size: int = _CHUNK) -> bytes:
+        if self.remaining <= 0:
+            return b""
+        data = self.fp.read(min(size, self.remaining))
+        self.remaining -= len(data)
+        return data
+
+    def readline(self, limit: int = _CHUNK) -> bytes:
+        if self.remaining <= 0:
+            return b""
+        line = self.fp.readline(min(limit, self.remaining))
+        self.remaining -= len(line)
+        return line
+
+
+def safe_name(name: str) -> str:
+    # Client-supplied names become host paths (e.g. GitHub); keep only the base name
+    return os.path.basename(name.replace("\\", "/")).strip()
+
+
+def generated_name(content_type: str) -> str:
+    ext = mimetypes.guess_extension(content_type) or ".png"
+    return f"{datetime.now():%Y%m%d%H%M%S}_{uuid.uuid4().hex[:6]}{ext}"
+
+
+def _spooled(threshold: int) -> tempfile.SpooledTemporaryFile:
+    # Stays in memory up to threshold bytes, then rolls over to a temp file
+    return tempfile.SpooledTemporaryFile(max_size=threshold)
+
+
+def read_raw(reader: BodyReader, name: str, threshold: int = DEFAULT_SPOOL_THRESHOLD) -> MemoryFile:
+    out = _spooled(threshold)
+    for chunk in iter(reader.read, b""):
+        out.write(chunk)
+    out.seek(0)
+    return MemoryFile(name, out)
+
+
+def read_multipart(
+    reader: BodyReader, boundary: str, threshold: int = DEFAULT_SPOOL_THRESHOLD
+) -> Tuple[List[MemoryFile], Dict[str, str]]:
+    delim = b"--" + boundary.encode("latin-1")
+    close = delim + b"--"
+    files: List[MemoryFile] = []
+    fields: Dict[str, str] = {}
+
+    line = reader.readline()
+    while line and line.rstrip(b"\r\n") not in (delim, close):
+        line = reader.readline()
+    while line and line.rstrip(b"\r\n") == delim:
+        headers = Message()
+        while True:
+            h = reader.readline()
+            if h in (b"", b"\r\n", b"\n"):
+                break
+            key, _, value = h.decode("utf-8", errors="replace").partition(":")
+            headers[key.strip()] = value.strip()
+
+        out = _spooled(threshold)
+        prev = b""
+        at_line_start = True
+        while True:
+            line = reader.readline()
+            if not line:
+                break
+            # Only a whole line can be a delimiter; readline() may return a partial one
+            if at_line_start and line.rstrip(b"\r\n") in (delim, close):
+                # the CRLF before the delimiter belongs to it, not to the part
+                if prev.endswith(b"\r\n"):
+                    prev = prev[:-2]
+                elif prev.endswith(b"\n"):
+                    prev = prev[:-1]
+                break
+            if prev.endswith(b"\r"):
+                # A partial line can stop between the CR and LF of the CRLF before the
+                # delimiter; hold the CR back until the next read shows which it is
+                out.write(prev[:-1])
+                line = b"\r" + line
+            else:
+                out.write(prev)
+            prev = line
+            at_line_start = line.endswith(b"\n")
+        out.write(prev)
+        out.seek(0)
+
+        name = headers.get_param("name", header="content-disposition") or ""
+        filename = headers.get_filename()
+        if filename:
+            files.append(MemoryFile(safe_name(filename) or generated_name(headers.get_content_type()), out))
+        else:
+            fields[str(name)] = out.read().decode("utf-8", errors="replace")
+            out.close()
+    # Drain an epilogue so the connection isn't left with unread bytes
+    while reader.read():
+        pass
+    return files, fields
@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import fnmatch
+import json
+import os
+import sys
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Sequence, Tuple
+
+from ..core.dirwatch import IMAGE_PATTERNS
+
+if TYPE_CHECKING:
+    from ..core.pipeline import PicGoCore
+
+DEFAULT_MANIFEST = "pypicgo-manifest.jsonl"
+
+Signature = Tuple[str, int, int]  # absolute path, size, mtime_ns
+
+
+def iter_files(root: str | Path, include: Sequence[str]) -> Iterator[str]:
+    # Depth-first, one directory listing in memory at a time; sorted so runs are repeatable
+    stack = [Path(root)]
+    while stack:
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as it:
+                entries = sorted(it, key=lambda e: e.name)
+        except OSError as e:
+            print(f"skipping {directory}: {e}", file=sys.stderr)
+            continue
+        subdirs = []
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                subdirs.append(Path(entry.path))
+            elif entry.is_file() and any(fnmatch.fnmatch(entry.name.lower(), p.lower()) for p in include):
+                yield entry.path
+        stack.extend(reversed(subdirs))
+
+
+def chunked(items: Iterable[str], size: int) -> Iterator[List[str]]:
+    chunk: List[str] = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class Manifest:
+    # Append-only JSONL checkpoint: one {"path", "size", "mtime", "url"} line per uploaded
+    # file, written as soon as its URL is known. A file counts as done while its size and
+    # mtime still match, so edited files are uploaded again on --resume.
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self._done: Dict[str, Tuple[int, int, str]] = {}
+        self._lock = threading.Lock()
+        self._fh = None
+
+    def load(self) -> int:
+        if not self.path.exists():
+            return 0
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    self._done[entry["path"]] = (entry["size"], entry["mtime"], entry["url"])
+                except (ValueError, KeyError):
+                    continue  # torn last line from an interrupted run
+        return len(self._done)
+
+    def open(self) -> None:
+        self._fh = open(self.path, "a", encoding="utf-8")
+
+    def close(self) -> None:
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+
+    @staticmethod
+    def signature(path: str) -> Signature | None:
+        # None when the file is gone (deleted since it was listed)
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return os.path.abspath(path), st.st_size, st.st_mtime_ns
+
+    def is_done(self, sig: Signature) -> bool:
+        key, size, mtime = sig
+        entry = self._done.get(key)
+        return entry is not None and entry[:2] == (size, mtime)
+
+    def record(self, sig: Signature, url: str) -> None:
+        # sig is taken before the upload, so a file edited meanwhile is uploaded again
+        key, size, mtime = sig
+        line = json.dumps({"path": key, "size": size, "mtime": mtime, "url": url}, ensure_ascii=False)
+        with self._lock:
+            self._done[key] = (size, mtime, url)
+            if self._fh is not None:
+                self._fh.write(line + "\n")
+                self._fh.flush()
+
+    def sync(self) -> None:
+        with self._lock:
+            if self._fh is not None:
+                os.fsync(self._fh.fileno())
+
+
+@dataclass
+class BatchResult:
+    uploaded: int = 0
+    skipped: int = 0
+    failed: int = 0
+
+
+def upload_tree(
+    core: PicGoCore,
+    files: Iterable[str],
+    manifest: Manifest,
+    chunk_size: int = 50,
+    host: str | None = None,
+    fmt: str | None = None,
+    use_cache: bool = True,
+) -> BatchResult:
+    result = BatchResult()
+    sigs: Dict[str, Signature] = {}
+
+    def pending() -> Iterator[str]:
+        for path in files:
+            sig = manifest.signature(path)
+            if sig is None or manifest.is_done(sig):
+                result.skipped += 1
+            else:
+                sigs[path] = sig
+                yield path
+
+    for chunk in chunked(pending(), max(1, chunk_size)):
+        # A failed file doesn't hold up the rest of its chunk; it stays out of the
+        # manifest and is retried by the next --resume
+        for item in core.run_iter(chunk, host=host, fmt=fmt, use_cache=use_cache):
+            if item.url is not None:
+                manifest.record(sigs[chunk[item.index]], item.url)
+                result.uploaded += 1
+                print(item.output, flush=True)
+            else:
+                result.failed += 1
+            if item.error is not None:
+                print(f"Error: {chunk[item.index]}: {item.error}", file=sys.stderr)
+        sigs.clear()  # the next chunk isn't listed until this loop asks for it
+        manifest.sync()
+        print(
+            f"[{result.uploaded} uploaded, {result.skipped} skipped, {result.failed} failed]",
+            file=sys.stderr,
+            flush=True,
+        )
+    return result
@@ -1,30 +1,69 @@
 from __future__ import annotations
 
 import argparse
+import itertools
+import os
 import sys
+import time
 from pathlib import Path
-from typing import List
+from typing import List, TYPE_CHECKING
 
 # Allow running directly from source
 if __name__ == "__main__" and __package__ is None:
     sys.path.insert(0, str(Path(__file__).parents[2]))
     __package__ = "pypicgo.cli"
 
-from ..core import PicGoCore
+from ..core.config import ConfigManager
+from .batch import DEFAULT_MANIFEST, IMAGE_PATTERNS, Manifest, iter_files, upload_tree
+
+if TYPE_CHECKING:
+    from ..core.pipeline import FileResult, PicGoCore
+
+
+def _core() -> PicGoCore:
+    # Imported on demand: `config` doesn't need the upload pipeline, and editor
+    # hooks start a new process per paste
+    from ..core.pipeline import PicGoCore
+
+    return PicGoCore()
+
+
+def _non_negative(value: str) -> int:
+    try:
+        n = int(value)
+    except ValueError:
+        n = -1
+    if n < 0:
+        raise argparse.ArgumentTypeError(f"expected a whole number, 0 or more: {value}")
+    return n
 
 
 def cmd_upload(args: argparse.Namespace) -> int:
-    core = PicGoCore()
     files: List[str] = []
     for p in args.files:
         if Path(p).is_file():
             files.append(p)
+        elif Path(p).is_dir():
+            print(f"skipping directory {p} (use --recursive)", file=sys.stderr)
+        else:
+            print(f"skipping {p}: not a file", file=sys.stderr)
+    if args.recursive:
+        return _upload_recursive(args, files)
     if not files:
         print("no files found")
         return 1
+    core = _core()
     try:
-        out = core.run(files, host=args.host, fmt=args.format)
+        out = core.run(files, host=args.host, fmt=args.format, use_cache=not args.no_cache)
         print(out)
+        opt = core.optimizer.totals
+        if opt["files"] and opt["bytes_in"]:
+            saved = opt["bytes_in"] - opt["bytes_out"]
+            print(
+                f"optimised {opt['files']} file(s): {opt['bytes_in']} -> {opt['bytes_out']} bytes"
+                f" (saved {saved}, {saved * 100 / opt['bytes_in']:.1f}%)",
+                file=sys.stderr,
+            )
         return 0
     except Exception as e:
         print(f"Error: {e}")
@@ -40,20 +79,81 @@ def cmd_upload(args: argparse.Namespace) -> int:
         return 1
 
 
+def _upload_recursive(args: argparse.Namespace, files: List[str]) -> int:
+    manifest = Manifest(args.manifest)
+    if args.resume:
+        print(f"resuming: {manifest.load()} file(s) already uploaded", file=sys.stderr)
+    elif manifest.path.exists():
+        print(f"{manifest.path} already exists; pass --resume to continue it or --manifest to start a new one")
+        return 1
+    include = args.include or IMAGE_PATTERNS
+    manifest_path = os.path.abspath(manifest.path)
+    # Lazily chained: only the current chunk of paths is ever held in memory
+    discovered = itertools.chain(files, *(iter_files(d, include) for d in args.recursive))
+    discovered = (p for p in discovered if os.path.abspath(p) != manifest_path)
+
+    core = _core()
+    manifest.open()
+    try:
+        result = upload_tree(
+            core, discovered, manifest, chunk_size=args.chunk_size,
+            host=args.host, fmt=args.format, use_cache=not args.no_cache,
+        )
+    finally:
+        manifest.close()
+    print(
+        f"done: {result.uploaded} uploaded, {result.skipped} skipped, {result.failed} failed"
+        f" (manifest: {manifest.path})",
+        file=sys.stderr,
+    )
+    return 1 if result.failed else 0
+
+
+def cmd_watch(args: argparse.Namespace) -> int:
+    from ..core.dirwatch import DirectoryWatcher
+
+    directory = args.dir or ConfigManager().data.get("dir_watch", {}).get("directory")
+    if not directory:
+        print("no directory given (pass DIR or set dir_watch.directory)")
+        return 1
+
+    def on_result(result: FileResult) -> None:
+        if result.output:
+            print(result.output, flush=True)
+        if result.error is not None:
+            print(f"Error: {result.file}: {result.error}", file=sys.stderr, flush=True)
+
+    watcher = DirectoryWatcher(_core(), directory, on_result=on_result, host=args.host, upload_existing=args.existing)
+    try:
+        watcher.start()
+    except RuntimeError as e:
+        print(f"Error: {e}")
+        return 1
+    print(f"watching {watcher.directory} (Ctrl+C to stop)", file=sys.stderr)
+    try:
+        while watcher.running:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    watcher.stop()
+    watcher.core.close()
+    return 0
+
+
 def cmd_config(args: argparse.Namespace) -> int:
-    core = PicGoCore()
+    config = ConfigManager()
     if args.action == "get":
         if args.host:
-            print(core.config.get_host_config(args.host))
+            print(config.get_host_config(args.host))
         else:
-            print(core.config.data)
+            print(config.data)
         return 0
     if args.action == "set":
         kv = dict(item.split("=", 1) for item in args.kv)
         if args.host:
-            core.config.set_host_config(args.host, kv)
+            config.set_host_config(args.host, kv)
         else:
-            core.config.set_global_config(kv)
+            config.set_global_config(kv)
         print("ok")
         return 0
     print("unknown action")
@@ -61,9 +161,17 @@ def cmd_config(args: argparse.Namespace) -> int:
 
 
 def cmd_history(args: argparse.Namespace) -> int:
-    core = PicGoCore()
+    core = _core()
     if args.action == "list":
-        for item in core.history.list():
+        items = core.history.query(
+            offset=args.offset,
+            limit=args.limit,
+            host=args.host,
+            since=args.since,
+            until=args.until,
+            newest_first=args.order == "desc",
+        )
+        for item in items:
             print(item)
         return 0
     if args.action == "clear":
@@ -74,6 +182,16 @@ def cmd_history(args: argparse.Namespace) -> int:
     return 1
 
 
+def cmd_cache(args: argparse.Namespace) -> int:
+    core = _core()
+    if args.action == "clear":
+        core.cache.clear()
+        print("ok")
+        return 0
+    print("unknown action")
+    return 1
+
+
 def cmd_plugin(args: argparse.Namespace) -> int:
     # 占位：插件系统后续实现
     print("plugin system not implemented yet")
@@ -85,11 +203,23 @@ def main(argv: List[str] | None = None) -> int:
     sub = parser.add_subparsers(dest="cmd", required=True)
 
     p_upload = sub.add_parser("upload", help="upload files")
-    p_upload.add_argument("files", nargs="+", help="file paths")
+    p_upload.add_argument("files", nargs="*", help="file paths")
     p_upload.add_argument("--host", default=None, help="image host")
     p_upload.add_argument("--format", default=None, help="output format")
+    p_upload.add_argument("--no-cache", action="store_true", help="upload even if the same bytes were uploaded before")
+    p_upload.add_argument("--recursive", "-r", action="append", metavar="DIR", default=[], help="upload every matching file under DIR")
+    p_upload.add_argument("--include", action="append", metavar="GLOB", help="file name pattern for --recursive (default: common image types)")
+    p_upload.add_argument("--chunk-size", type=int, default=50, help="files per upload run with --recursive")
+    p_upload.add_argument("--manifest", default=DEFAULT_MANIFEST, help="checkpoint file recording uploaded files")
+    p_upload.add_argument("--resume", action="store_true", help="skip files already recorded in the manifest")
     p_upload.set_defaults(func=cmd_upload)
 
+    p_watch = sub.add_parser("watch", help="upload new images saved to a folder")
+    p_watch.add_argument("dir", nargs="?", default=None, help="folder to watch (default: dir_watch.directory)")
+    p_watch.add_argument("--host", default=None, help="image host")
+    p_watch.add_argument("--existing", action="store_true", help="on the first run, also upload files already in the folder")
+    p_watch.set_defaults(func=cmd_watch)
+
     p_config = sub.add_parser("config", help="get/set config")
     p_config.add_argument("action", choices=["get", "set"])
     p_config.add_argument("--host", default=None)
@@ -98,8 +228,18 @@ def main(argv: List[str] | None = None) -> int:
 
     p_history = sub.add_parser("history", help="history ops")
     p_history.add_argument("action", choices=["list", "clear"])
+    p_history.add_argument("--offset", type=_non_negative, default=0)
+    p_history.add_argument("--limit", type=_non_negative, default=None)
+    p_history.add_argument("--host", default=None, help="only entries uploaded to this host")
+    p_history.add_argument("--since", default=None, help="ISO date/time, inclusive")
+    p_history.add_argument("--until", default=None, help="ISO date/time, exclusive")
+    p_history.add_argument("--order", choices=["asc", "desc"], default="asc")
     p_history.set_defaults(func=cmd_history)
 
+    p_cache = sub.add_parser("cache", help="upload cache ops")
+    p_cache.add_argument("action", choices=["clear"])
+    p_cache.set_defaults(func=cmd_cache)
+
     p_plugin = sub.add_parser("plugin", help="plugin ops")
     p_plugin.add_argument("action", choices=["list", "install", "remove"])
     p_plugin.set_defaults(func=cmd_plugin)
@@ -1,13 +1,34 @@
-from .pipeline import PicGoCore
-from .config import ConfigManager
-from .history import HistoryStore
-from .events import EventBus, Phase
+# Exports resolve on first access, so e.g. the CLI's `config` command can use
+# ConfigManager without importing the upload pipeline and its HTTP stack
+_EXPORTS = {
+    "PicGoCore": ".pipeline",
+    "FileResult": ".pipeline",
+    "ConfigManager": ".config",
+    "HistoryStore": ".history",
+    "open_history": ".history",
+    "UploadCache": ".cache",
+    "EventBus": ".events",
+    "Phase": ".events",
+    "UploadCancelled": ".scheduler",
+}
+
+
+def __getattr__(name: str):
+    if name in _EXPORTS:
+        import importlib
+
+        return getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 __all__ = [
     "PicGoCore",
+    "FileResult",
     "ConfigManager",
     "HistoryStore",
+    "open_history",
+    "UploadCache",
     "EventBus",
     "Phase",
+    "UploadCancelled",
 ]
-
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import hashlib
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict
+
+from ..adapters.source import Source, open_source
+
+_CHUNK = 1024 * 1024
+
+
+def file_digest(src: Source) -> str:
+    h = hashlib.sha256()
+    with open_source(src) as f:
+        for chunk in iter(lambda: f.read(_CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class UploadCache:
+    # Evict at most once per this many puts to keep the hot path cheap
+    EVICT_EVERY = 64
+
+    def __init__(self, path: Path, max_entries: int = 10000, max_age_days: float = 30) -> None:
+        self.path = path
+        self.max_entries = int(max_entries)
+        self.max_age = float(max_age_days) * 86400
+        self._lock = threading.Lock()
+        self._puts = 0
+        self._conn = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(uploads)")]
+        if columns and "target" not in columns:
+            # Entries from before the destination was part of the key can't be trusted
+            self._conn.execute("DROP TABLE uploads")
+        # target: the adapter's destination() fingerprint (repo, branch, account, ...)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS uploads ("
+            " host TEXT NOT NULL, target TEXT NOT NULL, digest TEXT NOT NULL, url TEXT NOT NULL,"
+            " size INTEGER NOT NULL, created REAL NOT NULL, used REAL NOT NULL,"
+            " PRIMARY KEY (host, target, digest))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS uploads_used ON uploads (used)")
+        self.evict()
+
+    @classmethod
+    def from_config(cls, path: Path, cfg: Dict[str, Any]) -> "UploadCache":
+        return cls(
+            path,
+            max_entries=cfg.get("max_entries", 10000),
+            max_age_days=cfg.get("max_age_days", 30),
+        )
+
+    def get(self, host: str, target: str, digest: str) -> str | None:
+        now = time.time()
+        key = (host, target, digest)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT url, created FROM uploads WHERE host = ? AND target = ? AND digest = ?", key
+            ).fetchone()
+            if row is None:
+                return None
+            url, created = row
+            if self.max_age > 0 and now - created > self.max_age:
+                self._conn.execute("DELETE FROM uploads WHERE host = ? AND target = ? AND digest = ?", key)
+                return None
+            self._conn.execute(
+                "UPDATE uploads SET used = ? WHERE host = ? AND target = ? AND digest = ?", (now, *key)
+            )
+            return url
+
+    def put(self, host: str, target: str, digest: str, url: str, size: int) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO uploads (host, target, digest, url, size, created, used)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (host, target, digest, url, size, now, now),
+            )
+            self._puts += 1
+            due = self._puts % self.EVICT_EVERY == 0
+        if due:
+            self.evict()
+
+    def evict(self) -> None:
+        with self._lock:
+            if self.max_age > 0:
+                self._conn.execute("DELETE FROM uploads WHERE created < ?", (time.time() - self.max_age,))
+            if self.max_entries > 0:
+                self._conn.execute(
+                    "DELETE FROM uploads WHERE rowid IN ("
+                    " SELECT rowid FROM uploads ORDER BY used DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM uploads")
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM uploads").fetchone()[0]
@@ -1,6 +1,17 @@
 from __future__ import annotations
 
+import atexit
 import subprocess
+import threading
+
+# Only the latest text matters, so a copy requested while another runs replaces any
+# that is still waiting instead of queueing behind it
+_pending: str | None = None
+_busy = False
+_cond = threading.Condition()
+_worker: threading.Thread | None = None
+# Longest a short-lived process (the CLI) waits at exit for its copy to finish
+EXIT_WAIT = 3.0
 
 
 def copy_text(text: str) -> None:
@@ -30,3 +41,35 @@ def copy_text(text: str) -> None:
     except Exception:
         pass
 
+
+def copy_text_async(text: str) -> None:
+    # copy_text can take seconds (the powershell fallback), so it runs on a background thread
+    global _pending, _worker
+    with _cond:
+        _pending = text
+        if _worker is None:
+            _worker = threading.Thread(target=_run, name="pypicgo-clipboard", daemon=True)
+            _worker.start()
+            atexit.register(wait_clipboard, EXIT_WAIT)
+        _cond.notify_all()
+
+
+def _run() -> None:
+    global _pending, _busy
+    while True:
+        with _cond:
+            while _pending is None:
+                _cond.wait()
+            text, _pending, _busy = _pending, None, True
+        try:
+            copy_text(text)
+        finally:
+            with _cond:
+                _busy = False
+                _cond.notify_all()
+
+
+def wait_clipboard(timeout: float | None = None) -> bool:
+    # True once no copy is queued or running
+    with _cond:
+        return _cond.wait_for(lambda: _pending is None and not _busy, timeout)
@@ -1,66 +1,191 @@
 from __future__ import annotations
 
+import copy
 import json
 import os
+import tempfile
+import threading
+import time
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, Tuple
+
+from ..utils.filelock import FileLock
 
 DEFAULT_CONFIG: Dict[str, Any] = {
     "default_host": "github",
     "format": "markdown",
     "copy_to_clipboard": True,
+    "max_workers": 8,
+    "http": {
+        "pool_size": 4,
+        "timeout": 60,
+        "idle_timeout": 60,
+    },
+    "retry": {
+        "attempts": 4,
+        "base_delay": 0.5,
+        "max_delay": 30,
+        "max_wait": 120,
+        "failure_threshold": 5,
+        "reset_timeout": 30,
+    },
     "hosts": {
         "github": {
             "repo": "",
             "branch": "main",
             "token": "",
             "path": "",
+            "max_concurrency": 1,
+            "batch_threshold": 5,
+            "tree_cache": True,
         },
         "smms": {
             "token": "",
+            "max_concurrency": 4,
         },
         "bilibili": {
             "sessdata": "",
             "bili_jct": "",
+            "max_concurrency": 4,
         },
     },
+    "server": {
+        "workers": 16,
+        "backlog": 64,
+    },
+    "jobs": {
+        "workers": 2,
+        "ttl": 3600,
+    },
+    "clipboard_watch": {
+        "min_interval": 0.5,
+        "max_interval": 4.0,
+    },
+    "dir_watch": {
+        "directory": "",
+        "settle": 1.0,
+        "batch_window": 0.5,
+        "max_batch": 20,
+        "poll_interval": 1.0,
+    },
     "history_enabled": True,
+    "history_backend": "jsonl",
+    # Group-commit window for the background history writer; 0 writes synchronously
+    "history_flush_ms": 200,
+    "cache": {
+        "enabled": True,
+        "max_entries": 10000,
+        "max_age_days": 30,
+    },
+    "optimize": {
+        "enabled": False,
+        "format": "keep",
+        "quality": 85,
+        "max_width": 0,
+        "max_height": 0,
+        "strip_metadata": True,
+        "workers": 0,
+    },
 }
 
 
 class ConfigManager:
+    # Seconds between checks of config.json for edits made by other processes
+    RELOAD_INTERVAL = 1.0
+
     def __init__(self, base_dir: Path | None = None) -> None:
         self.base_dir = base_dir or Path(os.path.expanduser("~")) / ".pypicgo"
         self.base_dir.mkdir(parents=True, exist_ok=True)
         self.config_path = self.base_dir / "config.json"
         self._config: Dict[str, Any] = {}
+        self._signature: Tuple[int, int, int] | None = None
+        self._checked = 0.0
+        self._lock = threading.RLock()
+        # Serialises read-modify-write cycles with the tray, API server and CLI runs
+        self._file_lock = FileLock(self.base_dir / "config.lock")
         self.load()
 
+    def _stat(self) -> Tuple[int, int, int] | None:
+        # An atomic save replaces the file, so the inode changes even if mtime doesn't
+        try:
+            st = os.stat(self.config_path)
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
     def load(self) -> None:
-        if self.config_path.exists():
+        with self._lock:
+            signature = self._stat()
+            self._checked = time.monotonic()
+            if signature is None:
+                with self._file_lock:
+                    if not self.config_path.exists():
+                        self._config = copy.deepcopy(DEFAULT_CONFIG)
+                        self.save()
+                        return
+                signature = self._stat()
             try:
                 self._config = json.loads(self.config_path.read_text(encoding="utf-8"))
             except Exception:
-                self._config = DEFAULT_CONFIG.copy()
-        else:
-            self._config = DEFAULT_CONFIG.copy()
-            self.save()
+                # Unreadable (e.g. half-written by an editor): keep what we had, or the defaults.
+                # The file is left alone so the user's edit isn't overwritten.
+                if not self._config:
+                    self._config = copy.deepcopy(DEFAULT_CONFIG)
+            self._signature = signature
+
+    def reload_if_changed(self, force: bool = False) -> bool:
+        now = time.monotonic()
+        if not force and now - self._checked < self.RELOAD_INTERVAL:
+            return False
+        with self._lock:
+            self._checked = now
+            if self._stat() == self._signature:
+                return False
+            self.load()
+            return True
 
     def save(self) -> None:
-        self.config_path.write_text(json.dumps(self._config, ensure_ascii=False, indent=2), encoding="utf-8")
+        with self._lock, self._file_lock:
+            # Write-then-rename: readers see the old file or the new one, never a partial write
+            fd, tmp = tempfile.mkstemp(prefix=".config-", suffix=".tmp", dir=str(self.base_dir))
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    f.write(json.dumps(self._config, ensure_ascii=False, indent=2))
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp, self.config_path)
+            except BaseException:
+                try:
+                    os.unlink(tmp)
+                except OSError:
+                    pass
+                raise
+            self._signature = self._stat()
 
     @property
     def data(self) -> Dict[str, Any]:
+        # Replaced wholesale on reload, so a reference taken here stays self-consistent
+        self.reload_if_changed()
         return self._config
 
     def get_host_config(self, host: str) -> Dict[str, Any]:
-        hosts = self._config.get("hosts", {})
-        return hosts.get(host, {})
+        # A copy, so per-upload hooks can't leak changes into the shared config
+        hosts = self.data.get("hosts", {})
+        return copy.deepcopy(hosts.get(host, {}))
 
     def set_host_config(self, host: str, cfg: Dict[str, Any]) -> None:
-        self._config.setdefault("hosts", {})[host] = cfg
-        self.save()
+        with self._lock, self._file_lock:
+            # Start from the file's current contents so edits made elsewhere aren't lost
+            self.reload_if_changed(force=True)
+            config = copy.deepcopy(self._config)
+            config.setdefault("hosts", {})[host] = cfg
+            self._config = config
+            self.save()
 
     def set_global_config(self, kv: Dict[str, Any]) -> None:
-        self._config.update(kv)
-        self.save()
+        with self._lock, self._file_lock:
+            self.reload_if_changed(force=True)
+            config = copy.deepcopy(self._config)
+            config.update(kv)
+            self._config = config
+            self.save()
@@ -0,0 +1,292 @@
+from __future__ import annotations
+
+import fnmatch
+import json
+import os
+import select
+import stat
+import struct
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+if TYPE_CHECKING:
+    from .pipeline import FileResult, PicGoCore
+
+# Also used by `upload --recursive`; this module is kept cheap to import for the CLI
+IMAGE_PATTERNS = ["*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.avif", "*.bmp", "*.svg", "*.ico"]
+
+# inotify(7)
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_Q_OVERFLOW = 0x00004000
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+_EVENT = struct.Struct("iIII")  # wd, mask, cookie, len; the name follows
+
+Signature = Tuple[int, int]  # size, mtime_ns
+
+
+class _Inotify:
+    # Minimal inotify binding over ctypes: one non-recursive watch on a directory
+
+    def __init__(self, directory: Path) -> None:
+        import ctypes
+        import ctypes.util
+
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        if libc.inotify_add_watch(self.fd, os.fsencode(str(directory)), _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE) < 0:
+            err = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(err, f"inotify_add_watch failed for {directory}")
+
+    def read(self, timeout: float) -> Tuple[Set[str], bool]:
+        # Names that changed within timeout, and whether the kernel queue overflowed
+        names: Set[str] = set()
+        overflow = False
+        if not select.select([self.fd], [], [], timeout)[0]:
+            return names, overflow
+        try:
+            buf = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return names, overflow
+        pos = 0
+        while pos + _EVENT.size <= len(buf):
+            _, mask, _, length = _EVENT.unpack_from(buf, pos)
+            pos += _EVENT.size
+            if mask & _IN_Q_OVERFLOW:
+                overflow = True
+            name = buf[pos:pos + length].rstrip(b"\0")
+            pos += length
+            if name:
+                names.add(os.fsdecode(name))
+        return names, overflow
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+class DirectoryWatcher:
+    # Uploads image files as they appear in a directory (e.g. a screenshot folder).
+    # A file is picked up once its size and mtime haven't changed for `settle` seconds;
+    # files that become ready within `batch_window` of each other go up as one batch.
+    # Handled files are remembered per directory under ~/.pypicgo/watch/, so a restart
+    # only uploads what arrived while it was stopped. On the very first start the files
+    # already there are taken as handled unless upload_existing is set.
+
+    def __init__(
+        self,
+        core: PicGoCore,
+        directory: str | Path,
+        on_status_change: Optional[Callable[[str], None]] = None,
+        on_result: Optional[Callable[[FileResult], None]] = None,
+        host: str | None = None,
+        upload_existing: bool = False,
+    ) -> None:
+        self.core = core
+        self.directory = Path(directory).expanduser().resolve()
+        self.on_status_change = on_status_change
+        self.on_result = on_result
+        self.host = host
+        self.upload_existing = upload_existing
+        self.running = False
+        self.thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        cfg = core.config.data.get("dir_watch", {})
+        self.settle = float(cfg.get("settle", 1.0))
+        self.batch_window = float(cfg.get("batch_window", 0.5))
+        self.max_batch = max(1, int(cfg.get("max_batch", 20)))
+        self.poll_interval = float(cfg.get("poll_interval", 1.0))
+        include = cfg.get("include") or IMAGE_PATTERNS
+        self.include: Sequence[str] = [include] if isinstance(include, str) else list(include)
+        import hashlib
+
+        digest = hashlib.sha1(str(self.directory).encode("utf-8")).hexdigest()[:16]
+        self.state_path = core.config.base_dir / "watch" / f"{digest}.json"
+        self._handled: Dict[str, Signature] = {}
+        # name -> (signature, time it was last seen changing)
+        self._pending: Dict[str, Tuple[Signature, float]] = {}
+        self._ready: List[str] = []
+        self._last_ready = 0.0
+        # Failed this session; retried after a restart or once the file changes
+        self._failed: Dict[str, Signature] = {}
+
+    def start(self) -> None:
+        if self.running:
+            return
+        if not self.directory.is_dir():
+            raise RuntimeError(f"not a directory: {self.directory}")
+        self.running = True
+        self._stop_event.clear()
+        self.thread = threading.Thread(target=self._run_loop, name="pypicgo-dirwatch", daemon=True)
+        self.thread.start()
+        if self.on_status_change:
+            self.on_status_change("running")
+
+    def stop(self) -> None:
+        if not self.running:
+            return
+        self.running = False
+        self._stop_event.set()
+        if self.thread:
+            self.thread.join(timeout=2)
+        if self.on_status_change:
+            self.on_status_change("stopped")
+
+    def _run_loop(self) -> None:
+        notifier: Optional[_Inotify] = None
+        if sys.platform.startswith("linux"):
+            try:
+                notifier = _Inotify(self.directory)
+            except OSError as e:
+                print(f"inotify unavailable, polling {self.directory}: {e}")
+        try:
+            self._load_state()
+            self._scan()
+            while not self._stop_event.is_set():
+                # Poll quickly while files are settling or a batch is collecting
+                busy = bool(self._pending or self._ready)
+                timeout = min(0.25, self.settle / 2 or 0.25) if busy else self.poll_interval
+                try:
+                    if notifier is not None:
+                        names, overflow = notifier.read(timeout)
+                        if overflow:
+                            self._scan()
+                        for name in names:
+                            self._observe(name)
+                    else:
+                        self._stop_event.wait(timeout)
+                        self._scan()
+                    self._settle()
+                    self._maybe_upload()
+                except Exception as e:
+                    print(f"Directory watch error: {e}")
+                    self._stop_event.wait(self.poll_interval)
+        finally:
+            if notifier is not None:
+                notifier.close()
+
+    def _matches(self, name: str) -> bool:
+        if name.startswith("."):
+            return False
+        lower = name.lower()
+        return any(fnmatch.fnmatch(lower, p.lower()) for p in self.include)
+
+    def _stat(self, name: str) -> Optional[Signature]:
+        try:
+            st = os.stat(self.directory / name)
+        except OSError:
+            return None
+        if not stat.S_ISREG(st.st_mode):
+            return None
+        return st.st_size, st.st_mtime_ns
+
+    def _scan(self) -> None:
+        with os.scandir(self.directory) as it:
+            names = [e.name for e in it if e.is_file()]
+        for name in names:
+            self._observe(name)
+
+    def _observe(self, name: str) -> None:
+        if not self._matches(name) or name in self._ready:
+            return
+        sig = self._stat(name)
+        if sig is None or self._handled.get(name) == sig or self._failed.get(name) == sig:
+            return
+        current = self._pending.get(name)
+        if current is None or current[0] != sig:
+            self._pending[name] = (sig, time.monotonic())
+
+    def _settle(self) -> None:
+        now = time.monotonic()
+        for name, (sig, since) in list(self._pending.items()):
+            latest = self._stat(name)
+            if latest is None:
+                del self._pending[name]  # deleted or renamed away before it settled
+            elif latest != sig:
+                self._pending[name] = (latest, now)
+            elif now - since >= self.settle and sig[0] > 0:
+                del self._pending[name]
+                self._ready.append(name)
+                self._last_ready = now
+
+    def _maybe_upload(self) -> None:
+        if not self._ready:
+            return
+        if len(self._ready) < self.max_batch and time.monotonic() - self._last_ready < self.batch_window:
+            return
+        batch, self._ready = self._ready[: self.max_batch], self._ready[self.max_batch:]
+        self._upload(batch)
+
+    def _upload(self, names: List[str]) -> None:
+        if self.on_status_change:
+            self.on_status_change("uploading")
+        outputs: List[str] = []
+        errors: List[str] = []
+        # Signatures as settled, so a file rewritten during the upload is picked up again
+        sigs = {name: self._stat(name) for name in names}
+        paths = [str(self.directory / name) for name in names]
+        for result in self.core.run_iter(paths, host=self.host):
+            name = names[result.index]
+            sig = sigs[name] or (0, 0)
+            if result.url is not None:
+                self._handled[name] = sig
+                self._failed.pop(name, None)
+                outputs.append(result.output)
+            else:
+                self._failed[name] = sig
+            if result.error is not None:
+                errors.append(f"{name}: {result.error}")
+            if self.on_result:
+                self.on_result(result)
+        self._save_state()
+        if outputs and self.core.config.data.get("copy_to_clipboard", True):
+            from .clipboard import copy_text_async
+
+            copy_text_async("\n".join(outputs))
+        if self.on_status_change:
+            self.on_status_change(f"error: {'; '.join(errors)}" if errors else "uploaded")
+
+    def _load_state(self) -> None:
+        try:
+            data = json.loads(self.state_path.read_text(encoding="utf-8"))
+            # Files deleted since are forgotten, so the state doesn't grow with the folder's history
+            self._handled = {
+                k: (int(v[0]), int(v[1])) for k, v in data.get("files", {}).items() if (self.directory / k).exists()
+            }
+            return
+        except FileNotFoundError:
+            pass
+        except (ValueError, TypeError, IndexError, AttributeError) as e:
+            print(f"ignoring unreadable watch state {self.state_path}: {e}")
+        self._handled = {}
+        if not self.upload_existing:
+            # First start: only files that arrive from now on are uploaded
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    if entry.is_file() and self._matches(entry.name):
+                        st = entry.stat()
+                        self._handled[entry.name] = (st.st_size, st.st_mtime_ns)
+            self._save_state()
+
+    def _save_state(self) -> None:
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        payload = json.dumps({"directory": str(self.directory), "files": self._handled}, ensure_ascii=False)
+        fd, tmp = tempfile.mkstemp(prefix=".watch-", suffix=".tmp", dir=str(self.state_path.parent))
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(payload)
+            os.replace(tmp, self.state_path)
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
@@ -1,9 +1,13 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+import time
+from dataclasses import dataclass, field
 from enum import Enum
 from typing import Callable, Dict, List, Any
 
+from ..adapters.source import Source
+from ..utils.metrics import HOOK_SECONDS, PHASE_SECONDS
+
 
 class Phase(str, Enum):
     INPUT = "input"
@@ -17,11 +21,13 @@ Hook = Callable[["Context"], "Context"]
 
 @dataclass
 class Context:
-    files: List[str]
+    files: List[Source]
     host: str
     config: Dict[str, Any]
     urls: List[str] | None = None
     output_text: str | None = None
+    # Free-form per-run data for hooks, e.g. meta["optimize"] from the image optimiser
+    meta: Dict[str, Any] = field(default_factory=dict)
 
 
 class EventBus:
@@ -42,7 +48,16 @@ class EventBus:
             hooks.remove(func)
 
     def run(self, phase: Phase, ctx: Context) -> Context:
+        start = time.perf_counter()
         for hook in self._hooks.get(phase, []):
+            hook_start = time.perf_counter()
             ctx = hook(ctx)
+            HOOK_SECONDS.observe(time.perf_counter() - hook_start, phase.value, _hook_name(hook))
+        PHASE_SECONDS.observe(time.perf_counter() - start, phase.value, ctx.host)
         return ctx
 
+
+def _hook_name(hook: Hook) -> str:
+    # Functions and bound methods have a qualname; callable objects report their class
+    return getattr(hook, "__qualname__", None) or type(hook).__qualname__
+
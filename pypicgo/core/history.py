@@ -1,41 +1,427 @@
 from __future__ import annotations
 
+import atexit
 import json
+import os
+import sqlite3
+import sys
+import threading
+import weakref
+from abc import ABC, abstractmethod
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, Iterable, Iterator, List
 
+from ..utils.filelock import FileLock
 
-class HistoryStore:
+HISTORY_BACKENDS = ("jsonl", "sqlite")
+# Read size when scanning the JSONL file backwards from its end
+_TAIL_BLOCK = 64 * 1024
+
+
+def _record(files: List[str], host: str, urls: List[str]) -> Dict[str, Any]:
+    return {
+        "time": datetime.utcnow().isoformat() + "Z",
+        "host": host,
+        "files": files,
+        "urls": urls,
+    }
+
+
+class HistoryStore(ABC):
+    # Abstract: open a store with open_history(base_dir, backend), which also imports a
+    # legacy history.json. HistoryStore(path) was the old whole-file store and is gone.
+
+    def add(self, files: List[str], host: str, urls: List[str]) -> None:
+        self.add_records([_record(files, host, urls)])
+
+    @abstractmethod
+    def add_records(self, records: Iterable[Dict[str, Any]]) -> None:
+        ...
+
+    @abstractmethod
+    def list(self) -> List[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def query(
+        self,
+        offset: int = 0,
+        limit: int | None = None,
+        host: str | None = None,
+        since: str | None = None,
+        until: str | None = None,
+        newest_first: bool = False,
+    ) -> Iterator[Dict[str, Any]]:
+        # since is inclusive, until exclusive; both compare against the ISO "time" field
+        ...
+
+    @abstractmethod
+    def clear(self) -> None:
+        ...
+
+
+class JsonlHistoryStore(HistoryStore):
     def __init__(self, path: Path) -> None:
         self.path = path
-        if not self.path.exists():
-            self._write([])
+        self._lock = threading.Lock()
+        # Held only for the append itself, so writers in other processes (tray, API
+        # server, CLI) never interleave lines; readers need no lock
+        self.file_lock = FileLock(path.with_name(path.name + ".lock"))
+        with self.file_lock:
+            self.path.touch(exist_ok=True)
+            self._repair_tail()
+        # In-memory index: byte offset, time and host of every record up to _indexed_end.
+        # Built lazily and extended from the tail, so appends by other processes are picked up.
+        self._offsets: List[int] = []
+        self._times: List[str] = []
+        self._hosts: List[str] = []
+        self._indexed_end = 0
 
-    def _read(self) -> List[Dict[str, Any]]:
-        try:
-            return json.loads(self.path.read_text(encoding="utf-8"))
-        except Exception:
-            return []
+    def _repair_tail(self) -> None:
+        # A crash mid-append can leave a torn last line; terminate it so the next
+        # record starts on its own line and only the torn one is skipped on read
+        with self.path.open("rb+") as f:
+            if f.seek(0, 2) == 0:
+                return
+            f.seek(-1, 2)
+            if f.read(1) != b"\n":
+                f.write(b"\n")
 
-    def _write(self, data: List[Dict[str, Any]]) -> None:
-        self.path.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+    def add_records(self, records: Iterable[Dict[str, Any]]) -> None:
+        data = "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records).encode("utf-8")
+        if not data:
+            return
+        with self._lock, self.file_lock:
+            # One unbuffered O_APPEND write per batch rather than a buffered file object,
+            # which may flush a large batch in several pieces
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT | getattr(os, "O_BINARY", 0), 0o644)
+            try:
+                view = memoryview(data)
+                while view:
+                    view = view[os.write(fd, view):]
+            finally:
+                os.close(fd)
 
-    def add(self, files: List[str], host: str, urls: List[str]) -> None:
-        data = self._read()
-        data.append(
-            {
-                "time": datetime.utcnow().isoformat() + "Z",
-                "host": host,
-                "files": files,
-                "urls": urls,
-            }
+    def _refresh_index(self) -> None:
+        size = self.path.stat().st_size
+        if size < self._indexed_end:
+            self._offsets, self._times, self._hosts, self._indexed_end = [], [], [], 0
+        if size == self._indexed_end:
+            return
+        with self.path.open("rb") as f:
+            f.seek(self._indexed_end)
+            pos = self._indexed_end
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # append still in progress
+                try:
+                    rec = json.loads(line)
+                    self._offsets.append(pos)
+                    self._times.append(str(rec.get("time", "")))
+                    self._hosts.append(str(rec.get("host", "")))
+                except ValueError:
+                    pass
+                pos += len(line)
+        self._indexed_end = pos
+
+    def query(
+        self,
+        offset: int = 0,
+        limit: int | None = None,
+        host: str | None = None,
+        since: str | None = None,
+        until: str | None = None,
+        newest_first: bool = False,
+    ) -> Iterator[Dict[str, Any]]:
+        if newest_first and limit is not None:
+            # "Latest N" (`history list --order desc`, GET /history?order=desc) reads only the
+            # end of the file instead of indexing all of it, which a short-lived process
+            # would otherwise do every time
+            yield from self._query_tail(offset, limit, host, since, until)
+            return
+        with self._lock:
+            self._refresh_index()
+            positions = range(len(self._offsets))
+            if newest_first:
+                positions = reversed(positions)
+            selected: List[int] = []
+            skipped = 0
+            for i in positions:
+                if limit is not None and len(selected) >= limit:
+                    break
+                if host is not None and self._hosts[i] != host:
+                    continue
+                t = self._times[i]
+                if (since is not None and t < since) or (until is not None and t >= until):
+                    continue
+                if skipped < offset:
+                    skipped += 1
+                    continue
+                selected.append(self._offsets[i])
+        with self.path.open("rb") as f:
+            for pos in selected:
+                f.seek(pos)
+                yield json.loads(f.readline())
+
+    def _query_tail(
+        self, offset: int, limit: int, host: str | None, since: str | None, until: str | None
+    ) -> List[Dict[str, Any]]:
+        selected: List[Dict[str, Any]] = []
+        if limit <= 0:
+            return selected
+        skipped = 0
+        for line in self._reversed_lines():
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                continue
+            if host is not None and str(rec.get("host", "")) != host:
+                continue
+            t = str(rec.get("time", ""))
+            if (since is not None and t < since) or (until is not None and t >= until):
+                continue
+            if skipped < offset:
+                skipped += 1
+                continue
+            selected.append(rec)
+            if len(selected) >= limit:
+                break
+        return selected
+
+    def _reversed_lines(self) -> Iterator[bytes]:
+        # Complete lines, last first; text after the final newline is an append in progress
+        with self.path.open("rb") as f:
+            pos = f.seek(0, 2)
+            buf = b""
+            trailing = True
+            while pos > 0:
+                step = min(_TAIL_BLOCK, pos)
+                pos -= step
+                f.seek(pos)
+                buf = f.read(step) + buf
+                lines = buf.split(b"\n")
+                buf = lines.pop(0)  # may start mid-line; completed by the next block
+                if trailing and lines:
+                    lines.pop()
+                    trailing = False
+                yield from reversed(lines)
+            if buf and not trailing:
+                yield buf
+
+    def list(self) -> List[Dict[str, Any]]:
+        items: List[Dict[str, Any]] = []
+        with self._lock, self.path.open("r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    items.append(json.loads(line))
+                except ValueError:
+                    continue
+        return items
+
+    def clear(self) -> None:
+        with self._lock, self.file_lock:
+            self.path.write_text("", encoding="utf-8")
+            self._offsets, self._times, self._hosts, self._indexed_end = [], [], [], 0
+
+
+class SqliteHistoryStore(HistoryStore):
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        # Other processes may hold the write lock; wait for them rather than fail
+        self._conn = sqlite3.connect(str(path), timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS history ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT, time TEXT NOT NULL, host TEXT NOT NULL,"
+            " files TEXT NOT NULL, urls TEXT NOT NULL)"
         )
-        self._write(data)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS history_time ON history (time)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS history_host ON history (host, time)")
+
+    def add_records(self, records: Iterable[Dict[str, Any]]) -> None:
+        rows = [
+            (
+                r.get("time", ""),
+                r.get("host", ""),
+                json.dumps(r.get("files") or [], ensure_ascii=False),
+                json.dumps(r.get("urls") or [], ensure_ascii=False),
+            )
+            for r in records
+        ]
+        with self._lock:
+            # IMMEDIATE takes the write lock up front, so concurrent writers queue on the
+            # busy timeout instead of failing to upgrade a read lock
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany("INSERT INTO history (time, host, files, urls) VALUES (?, ?, ?, ?)", rows)
+            except BaseException:
+                # Release the write lock; other processes would otherwise wait on it
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
 
     def list(self) -> List[Dict[str, Any]]:
-        return self._read()
+        with self._lock:
+            rows = self._conn.execute("SELECT time, host, files, urls FROM history ORDER BY id").fetchall()
+        return [self._row(r) for r in rows]
+
+    @staticmethod
+    def _row(row: tuple) -> Dict[str, Any]:
+        t, h, f, u = row
+        return {"time": t, "host": h, "files": json.loads(f), "urls": json.loads(u)}
+
+    def query(
+        self,
+        offset: int = 0,
+        limit: int | None = None,
+        host: str | None = None,
+        since: str | None = None,
+        until: str | None = None,
+        newest_first: bool = False,
+    ) -> Iterator[Dict[str, Any]]:
+        where: List[str] = []
+        params: List[Any] = []
+        if host is not None:
+            where.append("host = ?")
+            params.append(host)
+        if since is not None:
+            where.append("time >= ?")
+            params.append(since)
+        if until is not None:
+            where.append("time < ?")
+            params.append(until)
+        sql = "SELECT time, host, files, urls FROM history"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY id DESC" if newest_first else " ORDER BY id"
+        sql += " LIMIT ? OFFSET ?"
+        params += [-1 if limit is None else limit, offset]
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        for row in rows:
+            yield self._row(row)
 
     def clear(self) -> None:
-        self._write([])
+        with self._lock:
+            self._conn.execute("DELETE FROM history")
+
+
+class WriteBehindHistory(HistoryStore):
+    # Queues records and writes them from a background thread, so an upload doesn't wait
+    # for the disk. Records arriving within flush_interval of each other are committed
+    # together (one append / one sqlite transaction). Reads and clear() flush first, and
+    # pending records are flushed at interpreter exit.
+
+    def __init__(self, store: HistoryStore, flush_interval: float = 0.2) -> None:
+        self.store = store
+        self.flush_interval = flush_interval
+        self._pending: List[Dict[str, Any]] = []
+        self._cond = threading.Condition()
+        # Held while writing, so a flush() from another thread can't overtake the writer
+        self._write_lock = threading.Lock()
+        self._closed = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="pypicgo-history", daemon=True)
+        self._thread.start()
+        atexit.register(_close_ref, weakref.ref(self))
+
+    def add_records(self, records: Iterable[Dict[str, Any]]) -> None:
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("history store is closed")
+            self._pending.extend(records)
+            self._cond.notify()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+            # Group commit: let records from the rest of this burst join the batch
+            self._stop.wait(self.flush_interval)
+            self._write()
+
+    def _write(self) -> None:
+        with self._write_lock:
+            with self._cond:
+                batch, self._pending = self._pending, []
+            if not batch:
+                return
+            try:
+                self.store.add_records(batch)
+            except Exception as e:
+                print(f"history write failed, {len(batch)} record(s) lost: {e}", file=sys.stderr)
+
+    def flush(self) -> None:
+        self._write()
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._stop.set()
+        self._thread.join()
+        self._write()
+
+    def list(self) -> List[Dict[str, Any]]:
+        self.flush()
+        return self.store.list()
+
+    def query(
+        self,
+        offset: int = 0,
+        limit: int | None = None,
+        host: str | None = None,
+        since: str | None = None,
+        until: str | None = None,
+        newest_first: bool = False,
+    ) -> Iterator[Dict[str, Any]]:
+        self.flush()
+        return self.store.query(offset, limit, host, since, until, newest_first)
+
+    def clear(self) -> None:
+        with self._write_lock:
+            with self._cond:
+                self._pending = []
+            self.store.clear()
+
+
+def _close_ref(ref: "weakref.ref[WriteBehindHistory]") -> None:
+    store = ref()
+    if store is not None and not store._closed:
+        store.close()
+
+
+def open_history(base_dir: Path, backend: str = "jsonl", flush_interval: float = 0.0) -> HistoryStore:
+    # flush_interval > 0 wraps the store in a WriteBehindHistory
+    if backend == "sqlite":
+        store: HistoryStore = SqliteHistoryStore(base_dir / "history.db")
+    elif backend == "jsonl":
+        store = JsonlHistoryStore(base_dir / "history.jsonl")
+    else:
+        raise RuntimeError(f"unknown history backend: {backend} (expected one of {', '.join(HISTORY_BACKENDS)})")
+    legacy = base_dir / "history.json"
+    if legacy.exists():
+        # Two processes starting together must not both import it
+        with FileLock(base_dir / "history.json.lock"):
+            _migrate_legacy(legacy, store)
+    if flush_interval > 0:
+        store = WriteBehindHistory(store, flush_interval)
+    return store
+
 
+def _migrate_legacy(legacy: Path, store: HistoryStore) -> None:
+    # One-time import of the old whole-file history.json; renamed so it never runs twice
+    if not legacy.exists():
+        return
+    try:
+        data = json.loads(legacy.read_text(encoding="utf-8"))
+    except Exception:
+        data = []
+    if isinstance(data, list) and data:
+        store.add_records(data)
+    legacy.replace(legacy.with_name(legacy.name + ".migrated"))
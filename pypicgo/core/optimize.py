@@ -0,0 +1,191 @@
+from __future__ import annotations
+
+import io
+import os
+import sys
+import threading
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple
+
+from .events import Context
+from ..adapters.source import MemoryFile, Source, read_source, source_name
+
+if TYPE_CHECKING:
+    from concurrent.futures import Future, ProcessPoolExecutor
+
+# format option -> (Pillow format name, file extension)
+FORMATS = {
+    "jpeg": ("JPEG", ".jpg"),
+    "webp": ("WEBP", ".webp"),
+    "avif": ("AVIF", ".avif"),
+    "png": ("PNG", ".png"),
+}
+
+
+def optimize_image(data: bytes, name: str, opts: Dict[str, Any]) -> Tuple[Optional[bytes], str]:
+    # Returns (new bytes, new name), or (None, name) when the original should be kept
+    try:
+        from PIL import Image, ImageOps
+    except ImportError:
+        raise RuntimeError("image optimisation requires Pillow (pip install Pillow)")
+
+    try:
+        img = Image.open(io.BytesIO(data))
+        img.load()
+    except (OSError, SyntaxError, ValueError, Image.DecompressionBombError):
+        # Not something Pillow can decode (SVG, ICO variants, truncated files): upload as is
+        return None, name
+    if getattr(img, "is_animated", False):
+        return None, name
+
+    target = str(opts.get("format", "keep")).lower()
+    if target == "keep":
+        fmt = img.format or "PNG"
+        ext = os.path.splitext(name)[1]
+    elif target in FORMATS:
+        fmt, ext = FORMATS[target]
+    else:
+        raise RuntimeError(f"unknown optimize format: {target}")
+
+    strip = opts.get("strip_metadata", True) not in (False, "0", "false")
+    if strip:
+        # EXIF is dropped below, so bake its orientation into the pixels first
+        img = ImageOps.exif_transpose(img)
+
+    max_w = int(opts.get("max_width", 0) or 0)
+    max_h = int(opts.get("max_height", 0) or 0)
+    if max_w or max_h:
+        bound = (max_w or img.width, max_h or img.height)
+        if img.width > bound[0] or img.height > bound[1]:
+            img.thumbnail(bound, Image.LANCZOS)
+
+    # The ICC profile is colour information, not metadata, so it is always kept
+    save: Dict[str, Any] = {}
+    for key in ("icc_profile",) if strip else ("icc_profile", "exif"):
+        if img.info.get(key):
+            save[key] = img.info[key]
+
+    quality = int(opts.get("quality", 85))
+    if fmt == "JPEG":
+        if img.mode in ("RGBA", "LA", "P"):
+            rgba = img.convert("RGBA")
+            img = Image.new("RGB", rgba.size, (255, 255, 255))
+            img.paste(rgba, mask=rgba.getchannel("A"))
+        elif img.mode != "RGB":
+            img = img.convert("RGB")
+        save.update(quality=quality, optimize=True, progressive=True)
+    elif fmt == "WEBP":
+        save.update(quality=quality, method=6)
+    elif fmt == "AVIF":
+        save.update(quality=quality)
+    elif fmt == "PNG":
+        save.update(optimize=True)
+
+    out = io.BytesIO()
+    img.save(out, fmt, **save)
+    if out.tell() >= len(data):
+        return None, name
+    return out.getvalue(), os.path.splitext(name)[0] + ext
+
+
+def _optimize_path(path: str, opts: Dict[str, Any]) -> Tuple[Optional[bytes], str]:
+    # Worker entry point for local files: the worker reads the file itself
+    with open(path, "rb") as f:
+        return optimize_image(f.read(), os.path.basename(path), opts)
+
+
+def _keep_on_error(src: Source, get: Callable[[], Tuple[Optional[bytes], str]]) -> Tuple[Optional[bytes], str]:
+    # One bad file keeps its original bytes instead of failing the batch. RuntimeError
+    # (unknown format, no Pillow, a broken pool) is a setup problem and still propagates.
+    try:
+        return get()
+    except RuntimeError:
+        raise
+    except Exception as e:
+        print(f"optimize skipped for {source_name(src)}: {e}", file=sys.stderr)
+        return None, source_name(src)
+
+
+class ImageOptimizer:
+    # BEFORE_UPLOAD hook: resize / recompress / transcode every file in a process pool.
+    # Options come from the global "optimize" section, overridden per host by hosts.<name>.optimize.
+
+    def __init__(self, global_options: Callable[[], Dict[str, Any]]) -> None:
+        self._global_options = global_options
+        self._pool: ProcessPoolExecutor | None = None
+        self._lock = threading.Lock()
+        self.totals = {"files": 0, "bytes_in": 0, "bytes_out": 0}
+
+    def options(self, host_config: Dict[str, Any]) -> Dict[str, Any]:
+        return {**self._global_options(), **(host_config.get("optimize") or {})}
+
+    def _get_pool(self, workers: int) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                # imported here: multiprocessing is slow to import and most runs never need it
+                from concurrent.futures import ProcessPoolExecutor
+
+                self._pool = ProcessPoolExecutor(max_workers=workers or None)
+            return self._pool
+
+    def __call__(self, ctx: Context) -> Context:
+        opts = self.options(ctx.config)
+        if opts.get("enabled") not in (True, "1", "true") or not ctx.files:
+            return ctx
+        workers = int(opts.pop("workers", 0) or 0)
+
+        sizes: List[Optional[int]] = []
+        for f in ctx.files:
+            try:
+                sizes.append(len(read_source(f)) if isinstance(f, MemoryFile) else os.path.getsize(f))
+            except OSError:
+                sizes.append(None)  # left for the upload to report
+        readable = [f for f, size in zip(ctx.files, sizes) if size is not None]
+        results: List[Tuple[Optional[bytes], str]] = []
+        if len(readable) == 1:
+            # A single image (e.g. from the clipboard) isn't worth starting the pool for
+            src = readable[0]
+            results.append(_keep_on_error(src, lambda: optimize_image(read_source(src), source_name(src), opts)))
+        elif readable:
+            pool = self._get_pool(workers)
+            futures: List[Future] = []
+            for f in readable:
+                if isinstance(f, MemoryFile):
+                    futures.append(pool.submit(optimize_image, read_source(f), f.name, opts))
+                else:
+                    futures.append(pool.submit(_optimize_path, f, opts))
+            results = [_keep_on_error(f, fut.result) for f, fut in zip(readable, futures)]
+        done = iter(results)
+
+        files: List[Source] = []
+        bytes_out = 0
+        bytes_in = 0
+        for original, size in zip(ctx.files, sizes):
+            if size is None:
+                files.append(original)
+                continue
+            bytes_in += size
+            data, name = next(done)
+            if data is None:
+                files.append(original)
+                bytes_out += size
+            else:
+                files.append(MemoryFile(name, data))
+                bytes_out += len(data)
+        ctx.files = files
+        ctx.meta["optimize"] = {
+            "files": len(files),
+            "bytes_in": bytes_in,
+            "bytes_out": bytes_out,
+            "bytes_saved": bytes_in - bytes_out,
+        }
+        with self._lock:
+            self.totals["files"] += len(files)
+            self.totals["bytes_in"] += bytes_in
+            self.totals["bytes_out"] += bytes_out
+        return ctx
+
+    def shutdown(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown()
@@ -1,45 +1,528 @@
 from __future__ import annotations
 
+import queue
+import threading
+import time
+from dataclasses import dataclass
 from pathlib import Path
-from typing import List
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
 
 from .events import EventBus, Phase, Context
 from .config import ConfigManager
-from .history import HistoryStore
-from ..adapters import get_adapter
+from .history import open_history
+from .cache import UploadCache, file_digest
+from .scheduler import UploadScheduler, UploadCancelled, DEFAULT_MAX_WORKERS
+from .optimize import ImageOptimizer
+from ..adapters import UploaderAdapter, get_adapter
+from ..adapters.source import MemoryFile, Source, read_source, source_label, source_size
+from ..adapters.base import configure_state_dir
+from ..adapters.transport import configure_pool, get_pool
+from ..adapters.retry import configure_retry
+from ..adapters.ratelimit import configure_ratelimit, get_limiter
 from ..templates.output import render_output
 from ..plugins.loader import load_plugins
-from .clipboard import copy_text
+from ..utils.metrics import CACHE_HITS, CACHE_MISSES, ERRORS, PHASE_SECONDS, UPLOADED_BYTES, UPLOADED_FILES
+from .clipboard import copy_text_async
+
+ErrorReport = Callable[[int, BaseException], None]
+
+
+@dataclass
+class FileResult:
+    index: int  # position in the files passed to run_iter
+    file: Source
+    host: str
+    url: str | None = None
+    error: BaseException | None = None
+    output: str = ""  # this file rendered in the requested format
+    elapsed: float = 0.0  # seconds from the start of run_iter until this result
+
+    @property
+    def ok(self) -> bool:
+        return self.url is not None and self.error is None
 
 
 class PicGoCore:
     def __init__(self, base_dir: Path | None = None) -> None:
         self.events = EventBus()
         self.config = ConfigManager(base_dir)
-        history_path = (self.config.base_dir / "history.json")
-        self.history = HistoryStore(history_path)
+        self.history = open_history(
+            self.config.base_dir,
+            self.config.data.get("history_backend", "jsonl"),
+            float(self.config.data.get("history_flush_ms", 200)) / 1000,
+        )
+        configure_ratelimit(self.config.base_dir / "ratelimit")
+        configure_state_dir(self.config.base_dir / "adapters")
+        self.scheduler = UploadScheduler(int(self.config.data.get("max_workers", DEFAULT_MAX_WORKERS)))
+        self._applied: Tuple[Any, ...] | None = None
+        self._apply_config()
+        self._cache: UploadCache | None = None
+        self._cache_lock = threading.Lock()
+        # Built-in stage, registered ahead of plugin hooks so they see the optimised files
+        self.optimizer = ImageOptimizer(lambda: self.config.data.get("optimize", {}))
+        self.events.add_hook(Phase.BEFORE_UPLOAD, self.optimizer)
         load_plugins(self)
 
-    def run(self, files: List[str], host: str | None = None, fmt: str | None = None) -> str:
-        host = host or self.config.data.get("default_host", "github")
-        fmt = fmt or self.config.data.get("format", "markdown")
-        ctx = Context(files=files, host=host, config=self.config.get_host_config(host))
+    def _apply_config(self) -> None:
+        # http, retry and max_workers configure process-wide objects, so they are
+        # re-applied whenever a reloaded config.json changes them (tray, API server)
+        data = self.config.data
+        applied = (data.get("http", {}), data.get("retry", {}), int(data.get("max_workers", DEFAULT_MAX_WORKERS)))
+        if applied == self._applied:
+            return
+        self._applied = applied
+        configure_pool(applied[0])
+        configure_retry(applied[1])
+        self.scheduler.resize(applied[2])
 
-        ctx = self.events.run(Phase.INPUT, ctx)
-        ctx = self.events.run(Phase.BEFORE_UPLOAD, ctx)
+    def close(self) -> None:
+        # For long-running hosts (tray, API server, watch) on the way out: stops the
+        # worker threads and optimiser processes and closes pooled connections
+        self.scheduler.shutdown()
+        self.optimizer.shutdown()
+        get_pool().close()
 
-        adapter = get_adapter(host)
-        if adapter is None:
-            raise RuntimeError(f"no adapter registered for host: {host}")
-        urls = adapter.upload(ctx.files, ctx.config)
-        ctx.urls = urls
+    @property
+    def cache(self) -> UploadCache:
+        # Opened on first use: commands that never upload skip sqlite and its eviction pass
+        with self._cache_lock:
+            if self._cache is None:
+                self._cache = UploadCache.from_config(
+                    self.config.base_dir / "cache.db", self.config.data.get("cache", {})
+                )
+            return self._cache
+
+    def run(
+        self,
+        files: List[Source],
+        host: str | None = None,
+        fmt: str | None = None,
+        use_cache: bool = True,
+        on_result: Optional[Callable[[int, str], None]] = None,
+        cancel: Optional[threading.Event] = None,
+        clipboard: bool | None = None,
+    ) -> str:
+        # on_result(index, url) fires from worker threads as each file finishes;
+        # setting cancel stops files that haven't started and raises UploadCancelled.
+        # clipboard overrides copy_to_clipboard for this call.
+        self._apply_config()
+        fmt = fmt or self.config.data.get("format", "markdown")
+        report = on_result or (lambda index, url: None)
+        strategy = self.config.data.get("hosts_strategy") or {}
+        order = [h for h in strategy.get("order", []) if h]
+        if host is None and order and strategy.get("mode") == "hedge":
+            ctx = self._run_hedged(files, order, strategy, use_cache, report, cancel)
+        elif host is None and order and strategy.get("mode") == "failover":
+            ctx = self._run_failover(files, order, use_cache, report, cancel)
+        else:
+            ctx = self._run_host(files, host or self.config.data.get("default_host", "github"), use_cache, report, cancel)
+        urls = ctx.urls or []
 
         ctx = self.events.run(Phase.AFTER_UPLOAD, ctx)
         output_text = render_output(fmt, urls)
         ctx.output_text = output_text
 
         if self.config.data.get("history_enabled", True) and urls:
-            self.history.add(files=ctx.files, host=host, urls=urls)
-        if self.config.data.get("copy_to_clipboard", True) and output_text:
-            copy_text(output_text)
+            with PHASE_SECONDS.time("history", ctx.host):
+                self.history.add(files=[source_label(f) for f in ctx.files], host=ctx.host, urls=urls)
+        if clipboard is None:
+            clipboard = self.config.data.get("copy_to_clipboard", True)
+        if clipboard and output_text:
+            with PHASE_SECONDS.time("clipboard", ctx.host):
+                copy_text_async(output_text)
         return output_text
+
+    def run_iter(
+        self,
+        files: List[Source],
+        host: str | None = None,
+        fmt: str | None = None,
+        use_cache: bool = True,
+        cancel: Optional[threading.Event] = None,
+    ) -> Iterator[FileResult]:
+        # One FileResult per file, in completion order. Unlike run(), a failed file doesn't
+        # stop the others; with hosts_strategy failover only the failed files move on to the
+        # next host. AFTER_UPLOAD hooks, rendering and history run per file on the caller's
+        # thread while later files are still uploading. The clipboard is left to the caller.
+        # Under hedge mode results arrive once the winning host has finished.
+        self._apply_config()
+        fmt = fmt or self.config.data.get("format", "markdown")
+        start = time.perf_counter()
+        stop = threading.Event()
+        results: "queue.Queue[Tuple[int, str, str | None, BaseException | None] | None]" = queue.Queue()
+
+        def produce() -> None:
+            try:
+                self._stream(files, host, use_cache, stop, lambda *item: results.put(item))
+            finally:
+                results.put(None)
+
+        threading.Thread(target=produce, name="pypicgo-run-iter", daemon=True).start()
+        configs: Dict[str, Dict[str, Any]] = {}
+        try:
+            while True:
+                if cancel is not None and cancel.is_set():
+                    stop.set()
+                try:
+                    item = results.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                if item is None:
+                    return
+                index, used, url, error = item
+                result = FileResult(index, files[index], used, url, error)
+                if url is not None:
+                    if used not in configs:
+                        configs[used] = self.config.get_host_config(used)
+                    try:
+                        ctx = Context(files=[files[index]], host=used, config=configs[used], urls=[url])
+                        ctx = self.events.run(Phase.AFTER_UPLOAD, ctx)
+                        result.output = render_output(fmt, ctx.urls or [])
+                        if self.config.data.get("history_enabled", True):
+                            with PHASE_SECONDS.time("history", used):
+                                self.history.add(files=[source_label(files[index])], host=used, urls=ctx.urls or [])
+                    except Exception as e:
+                        result.error = e  # uploaded, but a hook or the history write failed
+                result.elapsed = time.perf_counter() - start
+                yield result
+        finally:
+            # Also reached when the caller stops iterating early: queued files are dropped
+            stop.set()
+
+    def _stream(
+        self,
+        files: List[Source],
+        host: str | None,
+        use_cache: bool,
+        cancel: threading.Event,
+        emit: Callable[[int, str, str | None, BaseException | None], None],
+    ) -> None:
+        # emit(index, host, url, error) exactly once per file
+        strategy = self.config.data.get("hosts_strategy") or {}
+        order = [h for h in strategy.get("order", []) if h]
+        if host is None and order and strategy.get("mode") == "hedge":
+            failures: List[Tuple[str, BaseException]] = []
+            try:
+                ctx = self._run_hedged(files, order, strategy, use_cache, lambda index, url: None, cancel, failures)
+            except Exception as e:
+                # Labelled with the host that failed last, not just the first in the order
+                failed_host = failures[-1][0] if failures else order[0]
+                for i in range(len(files)):
+                    emit(i, failed_host, None, e)
+                return
+            for i, url in enumerate(ctx.urls or []):
+                emit(i, ctx.host, url, None)
+            return
+
+        if host is None and order and strategy.get("mode") == "failover":
+            hosts = order
+        else:
+            hosts = [host or self.config.data.get("default_host", "github")]
+        remaining = list(range(len(files)))
+        failed: Dict[int, BaseException] = {}
+        for n, current in enumerate(hosts):
+            subset = remaining
+            done: Set[int] = set()
+            failed = {}
+            last = n == len(hosts) - 1
+
+            def report(i: int, url: str, subset: List[int] = subset, current: str = current, done: Set[int] = done) -> None:
+                done.add(subset[i])
+                emit(subset[i], current, url, None)
+
+            def on_error(
+                i: int, e: BaseException, subset: List[int] = subset, current: str = current,
+                done: Set[int] = done, failed: Dict[int, BaseException] = failed, last: bool = last,
+            ) -> None:
+                if last:  # nowhere left to retry, so don't hold it back
+                    done.add(subset[i])
+                    emit(subset[i], current, None, e)
+                else:
+                    failed[subset[i]] = e
+
+            try:
+                self._run_host([files[i] for i in subset], current, use_cache, report, cancel, on_error)
+            except Exception as e:
+                for i in subset:
+                    if i not in done:
+                        failed.setdefault(i, e)
+            remaining = sorted(failed)
+            if not remaining or cancel.is_set():
+                break
+        for i in remaining:
+            emit(i, current, None, failed[i])
+
+    def _run_host(
+        self,
+        files: List[Source],
+        host: str,
+        use_cache: bool,
+        report: Callable[[int, str], None],
+        cancel: Optional[threading.Event] = None,
+        on_error: Optional[ErrorReport] = None,
+    ) -> Context:
+        # With on_error, a failed adapter call is reported for its files instead of
+        # raised, and those files get None in ctx.urls
+        try:
+            ctx = Context(files=files, host=host, config=self.config.get_host_config(host))
+            ctx = self.events.run(Phase.INPUT, ctx)
+            ctx = self.events.run(Phase.BEFORE_UPLOAD, ctx)
+
+            adapter = get_adapter(host)
+            if adapter is None:
+                raise RuntimeError(f"no adapter registered for host: {host}")
+            with PHASE_SECONDS.time(Phase.UPLOAD.value, host):
+                if use_cache and self.config.data.get("cache", {}).get("enabled", True):
+                    ctx.urls = self._upload_cached(adapter, host, ctx, report, cancel, on_error)
+                elif on_error is not None:
+                    ctx.urls = self._upload_readable(adapter, host, ctx, report, cancel, on_error)
+                else:
+                    ctx.urls = self._upload(adapter, host, ctx.files, ctx, report, cancel)
+        except Exception as e:
+            ERRORS.inc(host, type(e).__name__)
+            raise
+        return ctx
+
+    def _run_failover(
+        self,
+        files: List[Source],
+        order: List[str],
+        use_cache: bool,
+        report: Callable[[int, str], None],
+        cancel: Optional[threading.Event] = None,
+    ) -> Context:
+        errors: List[str] = []
+        for host in order:
+            try:
+                return self._run_host(files, host, use_cache, report, cancel)
+            except UploadCancelled:
+                raise
+            except Exception as e:
+                errors.append(f"{host}: {e}")
+        raise RuntimeError("all hosts failed: " + "; ".join(errors))
+
+    def _run_hedged(
+        self,
+        files: List[Source],
+        order: List[str],
+        strategy: Dict[str, Any],
+        use_cache: bool,
+        report: Callable[[int, str], None],
+        cancel: Optional[threading.Event] = None,
+        failures: Optional[List[Tuple[str, BaseException]]] = None,
+    ) -> Context:
+        # Start the next host whenever the running ones haven't finished within
+        # hedge_after_ms (or one of them failed); the first to succeed wins and the
+        # others are cancelled. Their in-flight requests finish but are ignored.
+        # Each failed attempt is appended to failures as (host, error).
+        delay = float(strategy.get("hedge_after_ms", 1500)) / 1000
+        # Attempts read the files concurrently, so shared streams get private copies
+        files = [_detached(f) for f in files]
+        results: "queue.Queue[Tuple[int, Context | None, BaseException | None]]" = queue.Queue()
+        cancels: List[threading.Event] = []
+        if failures is None:
+            failures = []
+
+        def attempt(i: int, stop: threading.Event) -> None:
+            # Attempts don't report progress: a losing host's URLs must never reach the
+            # caller. The winner's ctx.urls are the buffer that gets reported below.
+            try:
+                results.put((i, self._run_host(files, order[i], use_cache, lambda index, url: None, stop), None))
+            except BaseException as e:
+                results.put((i, None, e))
+
+        def start_next() -> None:
+            stop = threading.Event()
+            cancels.append(stop)
+            threading.Thread(
+                target=attempt, args=(len(cancels) - 1, stop), name=f"pypicgo-hedge-{order[len(cancels) - 1]}", daemon=True
+            ).start()
+
+        try:
+            start_next()
+            running = 1
+            deadline = time.monotonic() + delay
+            while True:
+                if cancel is not None and cancel.is_set():
+                    for stop in cancels:
+                        stop.set()
+                timeout = 0.1
+                if len(cancels) < len(order):
+                    timeout = min(timeout, max(deadline - time.monotonic(), 0.0))
+                try:
+                    i, ctx, error = results.get(timeout=timeout)
+                except queue.Empty:
+                    if len(cancels) < len(order) and time.monotonic() >= deadline:
+                        start_next()
+                        running += 1
+                        deadline = time.monotonic() + delay
+                    continue
+                running -= 1
+                if ctx is not None:
+                    for index, url in enumerate(ctx.urls or []):
+                        report(index, url)
+                    return ctx
+                failures.append((order[i], error))
+                if isinstance(error, UploadCancelled) and cancel is not None and cancel.is_set():
+                    raise error
+                if len(cancels) < len(order):
+                    start_next()
+                    running += 1
+                    deadline = time.monotonic() + delay
+                elif running == 0:
+                    raise RuntimeError("all hosts failed: " + "; ".join(f"{h}: {e}" for h, e in failures))
+        finally:
+            for stop in cancels:
+                stop.set()
+
+    def _upload(
+        self,
+        adapter: UploaderAdapter,
+        host: str,
+        files: List[Source],
+        ctx: Context,
+        report: Callable[[int, str], None],
+        cancel: Optional[threading.Event] = None,
+        on_error: Optional[ErrorReport] = None,
+    ) -> List[str | None]:
+        if not files:
+            return []
+        work: List[Tuple[int, List[Source]]] = []
+        pos = 0
+        for batch in adapter.split(files, ctx.config):
+            work.append((pos, batch))
+            pos += len(batch)
+
+        limiter = get_limiter()
+        account = adapter.account(ctx.config)
+
+        def upload(item: Tuple[int, List[Source]]) -> List[str | None]:
+            start, batch = item
+            batch_urls: List[str | None] = []
+            # Sized before the upload: metrics must never fail or mask an upload
+            sizes = [_size_or_zero(f) for f in batch]
+            try:
+                with limiter.scope(host, ctx.config, account):
+                    # Reported as the adapter yields them, so a later failure in this
+                    # batch doesn't lose the URLs already uploaded
+                    for url in adapter.upload_iter(batch, ctx.config):
+                        report(start + len(batch_urls), url)
+                        batch_urls.append(url)
+            except Exception as e:
+                if on_error is None:
+                    raise
+                ERRORS.inc(host, type(e).__name__)
+                for j in range(len(batch_urls), len(batch)):
+                    on_error(start + j, e)
+            finally:
+                UPLOADED_FILES.inc(host, amount=len(batch_urls))
+                UPLOADED_BYTES.inc(host, amount=sum(sizes[: len(batch_urls)]))
+            return batch_urls + [None] * (len(batch) - len(batch_urls))
+
+        limit = ctx.config.get("max_concurrency", adapter.max_concurrency)
+        results = self.scheduler.map(host, limit, upload, work, cancel=cancel)
+        return [url for batch_urls in results for url in batch_urls]
+
+    def _upload_readable(
+        self,
+        adapter: UploaderAdapter,
+        host: str,
+        ctx: Context,
+        report: Callable[[int, str], None],
+        cancel: Optional[threading.Event],
+        on_error: ErrorReport,
+    ) -> List[str | None]:
+        # A file that is gone or unreadable is reported on its own instead of failing
+        # the adapter batch it would have been part of
+        readable: List[int] = []
+        for i, f in enumerate(ctx.files):
+            try:
+                source_size(f)
+            except Exception as e:
+                ERRORS.inc(host, type(e).__name__)
+                on_error(i, e)
+            else:
+                readable.append(i)
+        uploaded = self._upload(
+            adapter, host, [ctx.files[i] for i in readable], ctx,
+            lambda j, url: report(readable[j], url), cancel,
+            lambda j, error: on_error(readable[j], error),
+        )
+        urls: List[str | None] = [None] * len(ctx.files)
+        for i, url in zip(readable, uploaded):
+            urls[i] = url
+        return urls
+
+    def _upload_cached(
+        self,
+        adapter: UploaderAdapter,
+        host: str,
+        ctx: Context,
+        report: Callable[[int, str], None],
+        cancel: Optional[threading.Event] = None,
+        on_error: Optional[ErrorReport] = None,
+    ) -> List[str | None]:
+        # Hashed one by one so that, with on_error, an unreadable file fails alone
+        digests: List[str | None] = []
+        sizes: Dict[str, int] = {}
+        for i, f in enumerate(ctx.files):
+            try:
+                d = file_digest(f)
+                sizes[d] = source_size(f)
+            except Exception as e:
+                if on_error is None:
+                    raise
+                ERRORS.inc(host, type(e).__name__)
+                on_error(i, e)
+                digests.append(None)
+            else:
+                digests.append(d)
+        target = adapter.destination(ctx.config)
+        urls: List[str | None] = [self.cache.get(host, target, d) if d is not None else None for d in digests]
+        hits = 0
+        for i, url in enumerate(urls):
+            if url is not None:
+                hits += 1
+                report(i, url)
+        CACHE_HITS.inc(host, amount=hits)
+        CACHE_MISSES.inc(host, amount=sum(d is not None for d in digests) - hits)
+        # Identical files within one batch are uploaded once
+        pending: Dict[str, int] = {}
+        for i, (d, url) in enumerate(zip(digests, urls)):
+            if url is None and d is not None and d not in pending:
+                pending[d] = i
+        pending_digests = list(pending)
+
+        def on_fresh(index: int, url: str) -> None:
+            d = pending_digests[index]
+            if url:
+                self.cache.put(host, target, d, url, sizes[d])
+            for i, digest in enumerate(digests):
+                if digest == d and urls[i] is None:
+                    report(i, url)
+
+        def on_fresh_error(index: int, error: BaseException) -> None:
+            d = pending_digests[index]
+            for i, digest in enumerate(digests):
+                if digest == d and urls[i] is None:
+                    on_error(i, error)
+
+        uploaded = self._upload(
+            adapter, host, [ctx.files[i] for i in pending.values()], ctx, on_fresh, cancel,
+            on_fresh_error if on_error is not None else None,
+        )
+        fresh = dict(zip(pending_digests, uploaded))
+        return [url if url is not None or d is None else fresh[d] for d, url in zip(digests, urls)]
+
+
+def _detached(src: Source) -> Source:
+    if isinstance(src, MemoryFile) and not isinstance(src.data, (bytes, bytearray)):
+        return MemoryFile(src.name, read_source(src))
+    return src
+
+
+def _size_or_zero(src: Source) -> int:
+    try:
+        return source_size(src)
+    except OSError:
+        return 0
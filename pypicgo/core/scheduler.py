@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Deque, Dict, List, Optional, Sequence, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+DEFAULT_MAX_WORKERS = 8
+
+
+class UploadCancelled(RuntimeError):
+    pass
+
+
+class _HostSlots:
+    def __init__(self, limit: int) -> None:
+        self.limit = limit
+        self.active = 0
+        # Admitted only when a slot frees up, so they never occupy a pool worker while waiting
+        self.waiting: Deque[Callable[[], None]] = deque()
+
+
+class UploadScheduler:
+    def __init__(self, max_workers: int = DEFAULT_MAX_WORKERS) -> None:
+        self.max_workers = max(1, max_workers)
+        self._executor: ThreadPoolExecutor | None = None
+        self._lock = threading.Lock()
+        self._slots: Dict[str, _HostSlots] = {}
+
+    def resize(self, max_workers: int) -> None:
+        # A pool can't grow or shrink, so later work goes to a new one; the old pool
+        # finishes what it already has and its threads exit
+        with self._lock:
+            max_workers = max(1, max_workers)
+            if max_workers == self.max_workers:
+                return
+            self.max_workers = max_workers
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="pypicgo-upload"
+                )
+            return self._executor
+
+    def _acquire(self, host: str, limit: int, job: Callable[[], None] | None = None) -> bool:
+        # Limits are shared by every run() on this core, so concurrent callers
+        # (API server, clipboard watcher) never exceed a host's cap together. Work over
+        # the cap waits in the host's own queue, not in the pool, so a big batch for one
+        # host can't hold up the workers other hosts need.
+        with self._lock:
+            slots = self._slots.get(host)
+            if slots is None:
+                slots = self._slots[host] = _HostSlots(limit)
+            slots.limit = limit
+            if slots.active >= slots.limit:
+                if job is not None:
+                    slots.waiting.append(job)
+                return False
+            slots.active += 1
+            return True
+
+    def _release(self, host: str) -> None:
+        with self._lock:
+            slots = self._slots[host]
+            if slots.waiting and slots.active <= slots.limit:
+                # Hand the slot to the next job; it joins the back of the pool queue
+                job: Callable[[], None] | None = slots.waiting.popleft()
+            else:
+                slots.active -= 1
+                job = None
+        if job is not None:
+            self._get_executor().submit(self._run_slot, host, job)
+
+    def _submit(self, host: str, limit: int, job: Callable[[], None]) -> None:
+        if self._acquire(host, limit, job):
+            self._get_executor().submit(self._run_slot, host, job)
+
+    def _run_slot(self, host: str, job: Callable[[], None]) -> None:
+        try:
+            job()
+        finally:
+            self._release(host)
+
+    def map(
+        self,
+        host: str,
+        limit: int,
+        func: Callable[[T], R],
+        items: Sequence[T],
+        on_done: Optional[Callable[[int, R], None]] = None,
+        cancel: Optional[threading.Event] = None,
+    ) -> List[R]:
+        limit = max(1, int(limit))
+        futures: List[Future] = []
+
+        def job(index: int, item: T, fut: Future) -> None:
+            if not fut.set_running_or_notify_cancel():
+                return
+            try:
+                # Checked once the slot is granted so queued work stops promptly
+                if cancel is not None and cancel.is_set():
+                    raise UploadCancelled("upload cancelled")
+                result = func(item)
+                if on_done is not None:
+                    on_done(index, result)
+            except BaseException as e:
+                fut.set_exception(e)
+            else:
+                fut.set_result(result)
+
+        if len(items) == 1 and self._acquire(host, limit):
+            # A lone file with a free slot runs on the caller's thread, skipping the hand-off
+            fut: Future = Future()
+            self._run_slot(host, lambda: job(0, items[0], fut))
+            return [fut.result()]
+
+        for i, item in enumerate(items):
+            fut = Future()
+            futures.append(fut)
+            self._submit(host, limit, lambda i=i, item=item, fut=fut: job(i, item, fut))
+        try:
+            return [f.result() for f in futures]
+        except BaseException:
+            for f in futures:
+                f.cancel()
+            raise
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
@@ -1,14 +1,38 @@
 from __future__ import annotations
 
-import time
+import sys
 import threading
-import tempfile
-import os
-from pathlib import Path
+import uuid
+import zlib
+from datetime import datetime
+from io import BytesIO
 from PIL import Image, ImageGrab
-from typing import Callable, Optional
+from typing import Callable, Optional, Tuple
 
 from .pipeline import PicGoCore
+from ..adapters.source import MemoryFile
+
+
+def _sequence_reader() -> Optional[Callable[[], int]]:
+    # Windows bumps a counter on every clipboard change; reading it costs nothing,
+    # so the image only has to be grabbed when the number moves
+    if sys.platform != "win32":
+        return None
+    try:
+        import ctypes
+
+        func = ctypes.windll.user32.GetClipboardSequenceNumber  # type: ignore[attr-defined]
+        func.restype = ctypes.c_uint32
+        return lambda: int(func())
+    except Exception:
+        return None
+
+
+def image_fingerprint(img: Image.Image) -> Tuple[str, Tuple[int, int], int, int]:
+    # Change detection only, not integrity: two cheap checksums over the raw pixels
+    # cost a fraction of PNG-encoding them
+    data = img.tobytes()
+    return img.mode, img.size, zlib.crc32(data), zlib.adler32(data)
 
 
 class ClipboardWatcher:
@@ -18,7 +42,13 @@ class ClipboardWatcher:
         self.thread: Optional[threading.Thread] = None
         self._stop_event = threading.Event()
         self.on_status_change = on_status_change
-        self._last_image_data: Optional[bytes] = None
+        self._last_fingerprint: Optional[Tuple[str, Tuple[int, int], int, int]] = None
+        self._last_sequence: Optional[int] = None
+        self._read_sequence = _sequence_reader()
+        cfg = core.config.data.get("clipboard_watch", {})
+        # Poll every min_interval after a change, backing off to max_interval while idle
+        self.min_interval = float(cfg.get("min_interval", 0.5))
+        self.max_interval = float(cfg.get("max_interval", 4.0))
 
     def start(self) -> None:
         if self.running:
@@ -41,53 +71,59 @@ class ClipboardWatcher:
             self.on_status_change("stopped")
 
     def _run_loop(self) -> None:
+        interval = self.min_interval
         while not self._stop_event.is_set():
+            changed = False
             try:
-                self._check_clipboard()
+                changed = self._check_clipboard()
             except Exception as e:
                 print(f"Clipboard check error: {e}")
-            time.sleep(1)  # check every 1 second
+            interval = self.min_interval if changed else min(interval * 1.5, self.max_interval)
+            self._stop_event.wait(interval)
+
+    def _check_clipboard(self) -> bool:
+        # Returns True when the clipboard changed since the last check
+        seq = self._read_sequence() if self._read_sequence is not None else None
+        if seq is not None and seq == self._last_sequence:
+            return False
 
-    def _check_clipboard(self) -> None:
         # Grab clipboard content
         # Note: grabclipboard() returns Image object for images, list for files, None for others
         try:
             content = ImageGrab.grabclipboard()
         except Exception:
-            return
+            return False
+        self._last_sequence = seq
 
         if isinstance(content, Image.Image):
             # Check for duplicate image to prevent infinite loops or redundant uploads
-            # We compare raw bytes of the image
-            from io import BytesIO
-            with BytesIO() as b:
-                content.save(b, "PNG")
-                current_data = b.getvalue()
-            
-            if self._last_image_data == current_data:
-                return
-            
-            self._last_image_data = current_data
+            fingerprint = image_fingerprint(content)
+            if self._last_fingerprint == fingerprint:
+                return False
+
+            self._last_fingerprint = fingerprint
             self._handle_image(content)
-        else:
-            # If clipboard content is not an image (e.g. text), clear last image data
-            self._last_image_data = None
+            return True
+        # If clipboard content is not an image (e.g. text), clear last image fingerprint
+        changed = self._last_fingerprint is not None
+        self._last_fingerprint = None
+        return changed
 
     def _handle_image(self, img: Image.Image) -> None:
-        # Save to temp file
-        with tempfile.NamedTemporaryFile(suffix=".png", delete=False) as tmp:
-            tmp_path = tmp.name
-        
+        # Upload straight from memory; no temp file round trip
+        with BytesIO() as b:
+            img.save(b, "PNG")
+            png = b.getvalue()
+        name = f"{datetime.now():%Y%m%d%H%M%S}_{uuid.uuid4().hex[:6]}.png"
+
         try:
-            img.save(tmp_path, "PNG")
-            
             # Notify uploading (if callback available)
             if self.on_status_change:
                 self.on_status_change("uploading")
 
             # Upload using core
             # core.run will handle clipboard copying of the result URL
-            self.core.run([tmp_path])
+            self.core.run([MemoryFile(name, png)])
             
             if self.on_status_change:
                 self.on_status_change("uploaded")
@@ -96,10 +132,3 @@ class ClipboardWatcher:
             print(f"Upload failed: {e}")
             if self.on_status_change:
                 self.on_status_change(f"error: {e}")
-        finally:
-            # Cleanup temp file
-            try:
-                if os.path.exists(tmp_path):
-                    os.remove(tmp_path)
-            except Exception:
-                pass
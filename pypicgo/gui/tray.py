@@ -10,12 +10,16 @@ from pystray import MenuItem as item
 
 from ..core import PicGoCore
 from ..core.watch import ClipboardWatcher
+from ..core.dirwatch import DirectoryWatcher
 
 
 class TrayApp:
     def __init__(self) -> None:
         self.core = PicGoCore()
         self.watcher = ClipboardWatcher(self.core, self._on_status_change)
+        # Offered only once dir_watch.directory is configured
+        directory = self.core.config.data.get("dir_watch", {}).get("directory")
+        self.dir_watcher = DirectoryWatcher(self.core, directory, self._on_status_change) if directory else None
         self.icon: Optional[pystray.Icon] = None
         self._uploading = False
 
@@ -28,6 +32,13 @@ class TrayApp:
                 checked=lambda item: self.watcher.running,
                 radio=False
             ),
+            item(
+                "监听文件夹",
+                self._toggle_dir_watch,
+                checked=lambda item: bool(self.dir_watcher and self.dir_watcher.running),
+                enabled=lambda item: self.dir_watcher is not None,
+                radio=False
+            ),
             pystray.Menu.SEPARATOR,
             item("退出", self._quit)
         )
@@ -41,6 +52,11 @@ class TrayApp:
         
         # Auto start watcher
         self.watcher.start()
+        if self.dir_watcher is not None:
+            try:
+                self.dir_watcher.start()
+            except RuntimeError as e:
+                print(f"Folder watch not started: {e}")
         self.icon.run()
 
     def _create_image(self) -> Image.Image:
@@ -64,9 +80,26 @@ class TrayApp:
             self.watcher.start()
             icon.notify("开始监听剪贴板图片...", "PyPicGo")
 
+    def _toggle_dir_watch(self, icon: pystray.Icon, item: pystray.MenuItem) -> None:
+        if self.dir_watcher is None:
+            return
+        if self.dir_watcher.running:
+            self.dir_watcher.stop()
+            icon.notify("已停止监听文件夹", "PyPicGo")
+            return
+        try:
+            self.dir_watcher.start()
+        except RuntimeError as e:
+            icon.notify(f"无法监听文件夹: {e}", "PyPicGo")
+            return
+        icon.notify(f"开始监听文件夹: {self.dir_watcher.directory}", "PyPicGo")
+
     def _quit(self, icon: pystray.Icon, item: pystray.MenuItem) -> None:
         self.watcher.stop()
+        if self.dir_watcher is not None:
+            self.dir_watcher.stop()
         icon.stop()
+        self.core.close()
 
     def _on_status_change(self, status: str) -> None:
         if not self.icon:
@@ -1,28 +1,80 @@
 from __future__ import annotations
 
-from typing import List, TYPE_CHECKING
+import hashlib
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Dict, List, TYPE_CHECKING
 
 if TYPE_CHECKING:
     from ..core.pipeline import PicGoCore
 
+GROUP = "pypicgo.plugins"
+CACHE_FILE = "plugins.json"
+
+
+def environment_fingerprint() -> str:
+    # Installing or removing a distribution adds/removes a *.dist-info entry in a
+    # sys.path directory, which changes that directory's mtime
+    h = hashlib.sha256(sys.version.encode("utf-8"))
+    for entry in sys.path:
+        try:
+            mtime = os.stat(entry or ".").st_mtime_ns
+        except OSError:
+            mtime = 0
+        h.update(f"{entry}\0{mtime}\0".encode("utf-8"))
+    return h.hexdigest()
+
+
+def scan_entry_points() -> List[Dict[str, str]]:
+    from importlib.metadata import entry_points
+
+    eps = entry_points()
+    group = eps.select if hasattr(eps, "select") else None
+    entries = group(group=GROUP) if group else eps.get(GROUP, [])
+    return [{"name": ep.name, "value": ep.value} for ep in entries]
+
+
+def discover_plugins(cache_dir: Path | None = None) -> List[Dict[str, str]]:
+    # entry_points() reads the metadata of every installed distribution; reuse the
+    # last scan until the environment changes
+    if cache_dir is None:
+        return scan_entry_points()
+    cache_path = cache_dir / CACHE_FILE
+    fingerprint = environment_fingerprint()
+    try:
+        cached = json.loads(cache_path.read_text(encoding="utf-8"))
+        if cached.get("fingerprint") == fingerprint:
+            return cached["entries"]
+    except (OSError, ValueError, KeyError):
+        pass
+    entries = scan_entry_points()
+    try:
+        tmp = cache_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"fingerprint": fingerprint, "entries": entries}), encoding="utf-8")
+        os.replace(tmp, cache_path)
+    except OSError:
+        pass
+    return entries
+
 
 def load_plugins(core: PicGoCore) -> List[str]:
     loaded: List[str] = []
     try:
-        from importlib.metadata import entry_points
+        entries = discover_plugins(core.config.base_dir)
+        if not entries:
+            return loaded
+        from importlib.metadata import EntryPoint
 
-        eps = entry_points()
-        group = eps.select if hasattr(eps, "select") else None
-        entries = group(group="pypicgo.plugins") if group else eps.get("pypicgo.plugins", [])
-        for ep in entries:
+        for entry in entries:
             try:
-                plugin_cls = ep.load()
+                plugin_cls = EntryPoint(name=entry["name"], value=entry["value"], group=GROUP).load()
                 plugin = plugin_cls()
                 plugin.register(core)
-                loaded.append(ep.name)
+                loaded.append(entry["name"])
             except Exception:
                 continue
     except Exception:
         pass
     return loaded
-
@@ -0,0 +1,3 @@
+from .filelock import FileLock
+
+__all__ = ["FileLock"]